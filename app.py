@@ -1,26 +1,55 @@
 from xml.parsers.expat import errors
 import firebase_admin
 from firebase_admin import credentials, db
-from flask import Flask, request, jsonify, Response, stream_with_context
+from flask import Flask, request, jsonify, Response, stream_with_context, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from pathlib import Path
 from flask import request, jsonify
 import os
 import sys
-import uuid
+import time
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import requests
-import base64
+import fastjsonschema
+from contextlib import contextmanager
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlencode
 import tarfile
 import io
+import codecs
+import heapq
+from operator import itemgetter
+import logging
+import hashlib
+import threading
+import queue
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from code_cleaner import compress_code
 from dotenv import load_dotenv
 from file_tree_tokens import generate_file_tree_json, build_tree
 
+# orjson is optional; it parses large GitHub payloads several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# flask-compress is optional; review payloads are large, repetitive JSON
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# Logging is configured by the entry point (__main__ below, or gunicorn_conf.py),
+# not on import, so importers such as gunicorn and pytest keep their own handlers
+logger = logging.getLogger(__name__)
+
 # Ensure project root is on sys.path so `SecureBYTE_AI` package is importable
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
@@ -40,18 +69,53 @@ except Exception as e:
     LLMManager = None
     LLM_AVAILABLE = False
 
-# Get the database URL from environment variable
-SERVICE_ACCOUNT_PATH = os.environ.get('FIREBASE_SERVICE_ACCOUNT')
-if not SERVICE_ACCOUNT_PATH:
-    raise RuntimeError('FIREBASE_SERVICE_ACCOUNT environment variable not set.')
-
-cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
 DATABASE_URL = "https://byte-b61ba-default-rtdb.firebaseio.com/"
-firebase_admin.initialize_app(cred, {
-    'databaseURL': DATABASE_URL
-})
+
+# firebase_admin already reuses one keep-alive session (with a cached OAuth
+# token) for every db.reference() call, but urllib3's default pool keeps only
+# 10 connections per host; the read and job executors run more threads than
+# that, so size the pool to match and keep the SDK's retry policy.
+FIREBASE_POOL_SIZE = 32
+
+def widen_firebase_pool():
+    session = getattr(getattr(db.reference('/'), '_client', None), 'session', None)
+    if session is None:
+        return
+    for prefix, adapter in list(session.adapters.items()):
+        session.mount(prefix, HTTPAdapter(pool_maxsize=FIREBASE_POOL_SIZE, max_retries=adapter.max_retries))
+
+def init_firebase():
+    """Initialize the default Firebase app for this process; safe to call more than once"""
+    if getattr(firebase_admin, '_apps', None):
+        return
+    service_account_path = os.environ.get('FIREBASE_SERVICE_ACCOUNT')
+    if not service_account_path:
+        raise RuntimeError('FIREBASE_SERVICE_ACCOUNT environment variable not set.')
+    firebase_admin.initialize_app(credentials.Certificate(service_account_path), {
+        'databaseURL': DATABASE_URL
+    })
+    widen_firebase_pool()
+
+init_firebase()
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Serialize jsonify() responses with orjson; keys stay sorted like Flask's default"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+# Compress JSON responses (mostly review payloads) for clients that accept it;
+# level 4 keeps most of the size win at a fraction of the CPU of level 9
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+if Compress is not None:
+    Compress(app)
 # Relaxed CORS to unblock frontend: allow all origins (no credentials)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
@@ -80,32 +144,169 @@ GITHUB_CLIENT_ID = os.environ.get('GITHUB_CLIENT_ID')
 GITHUB_CLIENT_SECRET = os.environ.get('GITHUB_CLIENT_SECRET')
 GITHUB_REDIRECT_URI = os.environ.get('GITHUB_REDIRECT_URI')
 
-# Initialize LLM Manager if available
+# Initialize LLM Manager if available. With LLM_POOL_SIZE > 1, that many
+# independent managers are created and each review checks one out, so
+# concurrent reviews never share a client session.
+LLM_POOL_SIZE = max(1, int(os.environ.get('LLM_POOL_SIZE', '1')))
+_llm_pool = queue.Queue()
 llm = None
 if LLM_AVAILABLE and LLMManager:
     try:
         llm = LLMManager()
+        _llm_pool.put(llm)
+        for _ in range(LLM_POOL_SIZE - 1):
+            _llm_pool.put(LLMManager())
         print("LLM Manager initialized successfully")
     except Exception as e:
         print(f"Failed to initialize LLM Manager: {e}")
         llm = None
 
+@contextmanager
+def acquire_llm():
+    """Yield an LLM manager for one request; blocks while every pooled manager is busy"""
+    if LLM_POOL_SIZE == 1:
+        yield llm
+        return
+    instance = _llm_pool.get()
+    try:
+        yield instance
+    finally:
+        _llm_pool.put(instance)
+
 #prompt loader helper function
 def load_prompt(filename):
     with open(filename, 'r', encoding='utf-8') as f:
         return f.read()
 
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts')
+
+PROMPT_PATHS = {
+    "logic": os.path.join(PROMPT_DIR, "logic_prompt.txt"),
+    "testing": os.path.join(PROMPT_DIR, "testing_prompt.txt"),
+    "security": os.path.join(PROMPT_DIR, "security_prompt.txt")
+}
+
+# Prompt templates are read once at startup and pre-split around the {code}
+# placeholder, keyed by review type
+PROMPT_PARTS = {}
+for _review_type, _path in PROMPT_PATHS.items():
+    _before, _, _after = load_prompt(_path).partition('{code}')
+    PROMPT_PARTS[_review_type] = (_before, _after)
+
+def get_prompt_parts(review_type):
+    """Return (before, after) template text surrounding {code} for a review type"""
+    return PROMPT_PARTS[review_type]
+
 
 
 @app.route('/')
 def home():
     return success({'message': 'Welcome to SecureBYTE Backend!'}, meta={'version': '2.0', 'status': 'operational'})
 
+def loads_json(data):
+    """Parse a JSON body (bytes or str), using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_json(obj, indent=False):
+    """Serialize obj to a JSON str (keeping non-ASCII text as-is), using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode('utf-8')
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
 # Helper function to get current timestamp
 def get_timestamp():
-    return datetime.now().isoformat()
+    """
+    ISO timestamp for writes. Within a request every call returns the same
+    value, so all records touched by one request share a timestamp; background
+    jobs get a fresh one per call.
+    """
+    if not has_request_context():
+        return datetime.now().isoformat()
+    ts = g.get('ts')
+    if ts is None:
+        ts = g.ts = datetime.now().isoformat()
+    return ts
+
+# Record IDs use Firebase's push-key format: 8 characters of millisecond
+# timestamp followed by 12 random characters, so keys sort by creation time.
+# Generated locally because the Admin SDK's ref.push() costs a round-trip.
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+_push_id_lock = threading.Lock()
+_last_push_ms = 0
+_last_push_rand = []
+
+def new_id():
+    """Return a new unique, chronologically sortable record ID"""
+    global _last_push_ms, _last_push_rand
+    with _push_id_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms == _last_push_ms:
+            # Same millisecond: increment the random part so IDs stay ordered
+            i = len(_last_push_rand) - 1
+            while _last_push_rand[i] == len(PUSH_CHARS) - 1:
+                _last_push_rand[i] = 0
+                i -= 1
+            _last_push_rand[i] += 1
+        else:
+            _last_push_ms = now_ms
+            _last_push_rand = [b % len(PUSH_CHARS) for b in os.urandom(12)]
+        rand = list(_last_push_rand)
+    prefix = []
+    for _ in range(8):
+        now_ms, digit = divmod(now_ms, len(PUSH_CHARS))
+        prefix.append(PUSH_CHARS[digit])
+    return ''.join(reversed(prefix)) + ''.join(PUSH_CHARS[r] for r in rand)
+
+# Rank used to order security issues by severity (higher is more severe)
+SEVERITY_RANK = {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}
+
+def review_entries(reviews):
+    """
+    Return stored review entries as a list. Reviews are appended with push(),
+    so Firebase returns them as a dict keyed by push ID; older records hold a list.
+    """
+    if isinstance(reviews, dict):
+        return list(reviews.values())
+    return list(reviews or [])
+
+def iter_security_issues(reviews):
+    """Yield (file_data, issue) pairs from stored security review entries.
+
+    Entries are stored as ``{"review": {...}}`` objects; see migrations.py for
+    converting older string-encoded entries.
+    """
+    for entry in review_entries(reviews):
+        review = entry.get('review') if isinstance(entry, dict) else None
+        if not isinstance(review, dict):
+            continue
+        for file_data in review.get('files') or []:
+            if not isinstance(file_data, dict):
+                continue
+            for issue in file_data.get('issues') or []:
+                if isinstance(issue, dict):
+                    yield file_data, issue
 
 # Unified response helpers for consistent API shape
+
+def count_severities(reviews):
+    """Count security issues by severity level across review entries"""
+    counter = Counter((issue.get('severity') or {}).get('level', 'low')
+                      for _file_data, issue in iter_security_issues(reviews))
+    return {level: counter[level] for level in SEVERITY_RANK}
+
+def record_severity_totals(record):
+    """
+    Severity counts over a submission's security reviews. Uses the
+    severity_totals that migrations.py backfills on legacy submissions (new
+    security reviews are stored on projects), otherwise walks the reviews.
+    """
+    totals = record.get('severity_totals')
+    if isinstance(totals, dict):
+        return {level: int(totals.get(level) or 0) for level in SEVERITY_RANK}
+    return count_severities(record.get('securityrev'))
+
 def success(data=None, meta=None, status=200):
     """Return standardized success response"""
     payload = {"success": True}
@@ -128,28 +329,211 @@ def error(message, code="bad_request", detail=None, status=400):
         payload["error"]["detail"] = detail
     return jsonify(payload), status
 
+# Shared pool for independent Firebase reads within a request
+EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix='reads')
+
+# Short-lived per-process cache of whole user subtrees for the read-heavy
+# dashboard, metrics and history endpoints. Writes through this API invalidate
+# it (see invalidate_user_cache_on_write); other writers are seen within the TTL.
+PROJECTS_CACHE = TTLCache(maxsize=10_000, ttl=10)
+SUBMISSIONS_CACHE = TTLCache(maxsize=10_000, ttl=10)
+_user_cache_lock = threading.Lock()
+
+def invalidate_user_cache(user_id):
+    with _user_cache_lock:
+        PROJECTS_CACHE.pop(user_id, None)
+        SUBMISSIONS_CACHE.pop(user_id, None)
+
+@app.after_request
+def invalidate_user_cache_on_write(response):
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        user_id = (request.view_args or {}).get('user_id')
+        if user_id:
+            invalidate_user_cache(user_id)
+    return response
+
+def _read_cached(cache, user_id, node):
+    with _user_cache_lock:
+        data = cache.get(user_id)
+    if data is None:
+        data = db.reference(f'users/{user_id}/{node}').get() or {}
+        with _user_cache_lock:
+            cache[user_id] = data
+    return data
+
+def get_user_projects_and_submissions(user_id):
+    """
+    Read a user's projects and submissions concurrently, served from a short
+    TTL cache when possible. The returned dicts are shared; don't mutate them.
+    """
+    projects_future = EXECUTOR.submit(_read_cached, PROJECTS_CACHE, user_id, 'projects')
+    submissions_future = EXECUTOR.submit(_read_cached, SUBMISSIONS_CACHE, user_id, 'submissions')
+    return projects_future.result(), submissions_future.result()
+
+def project_file_ids(project):
+    """Return the submission IDs in a project's fileids set"""
+    fileids = (project or {}).get('fileids') or []
+    if isinstance(fileids, dict):
+        # Keyed set {submission_id: true}; legacy arrays that Firebase returns
+        # as dicts keyed by index map to the ID itself
+        return [sid if value is True else value for sid, value in fileids.items() if value]
+    return [sid for sid in fileids if sid]
+
+def fileids_updates(project_id, project, add=(), remove=()):
+    """
+    Multi-path updates (relative to users/{user_id}) that add/remove submission
+    IDs in a project's fileids keyed set. Each ID is its own child path, so
+    concurrent writers never overwrite each other's changes. A project still
+    holding a legacy fileids array is rewritten as a set in the same update.
+    """
+    fileids = (project or {}).get('fileids')
+    if fileids and not (isinstance(fileids, dict) and all(v is True for v in fileids.values())):
+        id_set = dict.fromkeys(project_file_ids(project), True)
+        id_set.update(dict.fromkeys(add, True))
+        for sid in remove:
+            id_set.pop(sid, None)
+        return {f'projects/{project_id}/fileids': id_set}
+    updates = {f'projects/{project_id}/fileids/{sid}': True for sid in add}
+    updates.update({f'projects/{project_id}/fileids/{sid}': None for sid in remove})
+    return updates
+
+# Firebase rejects oversized writes, so bulk imports and uploads write their
+# submissions in multi-path updates carrying at most this much code each
+SUBMISSION_BATCH_BYTES = 8 * 1024 * 1024
+
+class SubmissionBatches:
+    """
+    Write a project's new submissions under users/{user_id} in size-bounded
+    multi-path updates. Every batch also adds its IDs to the project's fileids
+    and bumps updated_at, so an import that fails part-way leaves each written
+    submission linked. on_flush(written) runs after each batch.
+    """
+    def __init__(self, user_id, project_id, project, ts, on_flush=None):
+        self.ref = db.reference(f'users/{user_id}')
+        self.project_id = project_id
+        self.project = project
+        self.ts = ts
+        self.on_flush = on_flush
+        self.created_ids = []
+        self.updates = {}
+        self.pending_ids = []
+        self.pending_bytes = 0
+
+    def add(self, submission):
+        self.updates[f'submissions/{submission["id"]}'] = submission
+        self.pending_ids.append(submission['id'])
+        self.pending_bytes += len(submission['code'].encode('utf-8', errors='ignore'))
+        if self.pending_bytes >= SUBMISSION_BATCH_BYTES:
+            self.flush()
+
+    def flush(self):
+        """Write the pending batch; call once more at the end, even with nothing pending"""
+        self.updates.update(fileids_updates(self.project_id, self.project, add=self.pending_ids))
+        self.updates[f'projects/{self.project_id}/updated_at'] = self.ts
+        self.ref.update(self.updates)
+        # Any legacy fileids array is a set now, so later batches add single children
+        self.project = None
+        self.created_ids.extend(self.pending_ids)
+        self.updates = {}
+        self.pending_ids = []
+        self.pending_bytes = 0
+        if self.on_flush:
+            self.on_flush(len(self.created_ids))
+
+def submission_project_id(user_id, submission_id):
+    """
+    Return (exists, project_id) for a submission, reading only its projectid
+    rather than the whole record with its code and review history
+    """
+    path = f'users/{user_id}/submissions/{submission_id}'
+    project_id = db.reference(f'{path}/projectid').get()
+    if project_id:
+        return True, project_id
+    return bool(db.reference(path).get(shallow=True)), None
+
+def read_project_fileids(user_id, project_id):
+    """Read just a project's fileids (not its review history)"""
+    return db.reference(f'users/{user_id}/projects/{project_id}/fileids').get()
+
+def project_view(project):
+    """Project as returned by the API, with fileids as an array of submission IDs"""
+    return {**project, 'fileids': project_file_ids(project)}
+
+def query_project_submissions(user_id, project_id):
+    """
+    Return {submission_id: submission} for one project using the projectid
+    index (see database.rules.json) instead of reading every submission.
+    """
+    return db.reference(f'users/{user_id}/submissions').order_by_child('projectid').equal_to(project_id).get() or {}
+
+# Request body schemas, compiled once at startup so invalid requests are
+# rejected before any database round-trip
+
+MAX_NAME_LENGTH = 200
+MAX_DESC_LENGTH = 2000
+MAX_FILENAME_LENGTH = 1024
+MAX_CODE_LENGTH = 10 * 1024 * 1024
+
+PROJECT_FIELDS = {
+    'project_name': {'type': 'string', 'minLength': 1, 'maxLength': MAX_NAME_LENGTH},
+    'project_desc': {'type': 'string', 'maxLength': MAX_DESC_LENGTH},
+}
+
+SUBMISSION_FIELDS = {
+    'filename': {'type': 'string', 'minLength': 1, 'maxLength': MAX_FILENAME_LENGTH},
+    'code': {'type': 'string', 'maxLength': MAX_CODE_LENGTH},
+    'logicrev': {'type': ['array', 'object']},
+    'testcases': {'type': 'array'},
+}
+
+CREATE_PROJECT_VALIDATOR = fastjsonschema.compile(
+    {'type': 'object', 'required': ['project_name'], 'properties': PROJECT_FIELDS})
+UPDATE_PROJECT_VALIDATOR = fastjsonschema.compile(
+    {'type': 'object', 'properties': PROJECT_FIELDS})
+CREATE_SUBMISSION_VALIDATOR = fastjsonschema.compile(
+    {'type': 'object', 'required': ['filename'], 'properties': SUBMISSION_FIELDS})
+UPDATE_SUBMISSION_VALIDATOR = fastjsonschema.compile(
+    {'type': 'object', 'properties': SUBMISSION_FIELDS})
+
+def validation_error(validator, data):
+    """Run a compiled schema validator; return an error response if data is invalid, else None"""
+    try:
+        validator(data)
+    except fastjsonschema.JsonSchemaException as e:
+        if e.name == 'data' and e.rule == 'type':
+            message = 'Request body must be a JSON object'
+        elif e.rule == 'required':
+            missing = [field for field in e.rule_definition if field not in e.value]
+            message = f'{missing[0]} is required'
+        else:
+            message = e.message[len('data.'):] if e.message.startswith('data.') else e.message
+        return error(message, code='validation_error', status=400)
+    return None
+
 # Projects endpoints
 
 @app.route('/users/<user_id>/projects', methods=['POST'])
 def create_project(user_id):
     """Create a new project for a specific user"""
-    data = request.json
+    data = request.get_json(silent=True)
     
-    # Validate required fields
-    if not data.get('project_name'):
-        return error('project_name is required', code='validation_error', status=400)
+    # Validate the body before touching the database
+    invalid = validation_error(CREATE_PROJECT_VALIDATOR, data)
+    if invalid:
+        return invalid
     
     # Generate project ID
-    project_id = str(uuid.uuid4())
+    project_id = new_id()
     
     # Prepare project data
+    ts = get_timestamp()
     project_data = {
         'projectid': project_id,
         'project_name': data['project_name'],
         'project_desc': data.get('project_desc', ''),
-        'fileids': [],  # Array of submission IDs
-        'created_at': get_timestamp(),
-        'updated_at': get_timestamp()
+        'fileids': {},  # Set of submission IDs ({submission_id: true})
+        'created_at': ts,
+        'updated_at': ts
     }
     
     # Store in user-specific path
@@ -165,7 +549,7 @@ def get_projects(user_id):
     projects = ref.get() or {}
     
     # Convert to list format
-    result = list(projects.values())
+    result = [project_view(project) for project in projects.values()]
     return success(result)
 
 @app.route('/users/<user_id>/projects/<project_id>', methods=['GET'])
@@ -177,12 +561,17 @@ def get_project(user_id, project_id):
     if not project:
         return error('Project not found', code='not_found', status=404)
     
-    return success(project)
+    return success(project_view(project))
 
 @app.route('/users/<user_id>/projects/<project_id>', methods=['PUT'])
 def update_project(user_id, project_id):
     """Update a project"""
-    data = request.json
+    data = request.get_json(silent=True)
+    
+    # Validate the body before touching the database
+    invalid = validation_error(UPDATE_PROJECT_VALIDATOR, data)
+    if invalid:
+        return invalid
     
     # Add updated timestamp
     data['updated_at'] = get_timestamp()
@@ -200,22 +589,20 @@ def update_project(user_id, project_id):
 def delete_project(user_id, project_id):
     """Delete a project and all its submissions"""
     project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
+    # Submissions carrying the projectid that never made it into fileids
+    # must go too; the indexed query runs while the project is read
+    submissions_future = EXECUTOR.submit(query_project_submissions, user_id, project_id)
     
     # Check if project exists
     project = project_ref.get()
     if not project:
         return error('Project not found', code='not_found', status=404)
     
-    # Delete all submissions for this project
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    submissions = submissions_ref.get() or {}
-    
-    for submission_id, submission in submissions.items():
-        if submission.get('projectid') == project_id:
-            db.reference(f'users/{user_id}/submissions/{submission_id}').delete()
-    
-    # Delete the project
-    project_ref.delete()
+    # Delete the project and all its submissions in one multi-path update
+    submission_ids = set(project_file_ids(project)).union(submissions_future.result())
+    updates = {f'submissions/{sid}': None for sid in submission_ids}
+    updates[f'projects/{project_id}'] = None
+    db.reference(f'users/{user_id}').update(updates)
     
     return success(meta={'message': 'Project and related submissions deleted successfully'})
 
@@ -230,8 +617,11 @@ def delete_projects(user_id):
         return error("No project IDs provided", code="bad_request", status=400)
 
     deleted_projects = 0
+    updates = {}
+    # Also delete submissions found by the projectid index but missing from fileids
+    submission_futures = [EXECUTOR.submit(query_project_submissions, user_id, project_id) for project_id in ids]
 
-    for project_id in ids:
+    for project_id, submissions_future in zip(ids, submission_futures):
         project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
         project = project_ref.get()
 
@@ -239,20 +629,15 @@ def delete_projects(user_id):
         if not project:
             continue
 
-        # Delete matching submissions
-        submissions_ref = db.reference(f'users/{user_id}/submissions')
-        submissions = submissions_ref.get() or {}
-
-        for submission_id, submission in submissions.items():
-            if submission.get('projectid') == project_id:
-                db.reference(
-                    f'users/{user_id}/submissions/{submission_id}'
-                ).delete()
-
-        # Delete the project
-        project_ref.delete()
+        # Queue the project's submissions and the project for deletion
+        for submission_id in set(project_file_ids(project)).union(submissions_future.result()):
+            updates[f'submissions/{submission_id}'] = None
+        updates[f'projects/{project_id}'] = None
         deleted_projects += 1
 
+    if updates:
+        db.reference(f'users/{user_id}').update(updates)
+
     if deleted_projects == 0:
         # Nothing matched the provided IDs – surface this clearly to the client
         return error(
@@ -341,11 +726,12 @@ def save_project(user_id, project_id):
 @app.route('/users/<user_id>/projects/<project_id>/submissions', methods=['POST'])
 def create_submission(user_id, project_id):
     """Create a new submission for a project"""
-    data = request.json
+    data = request.get_json(silent=True)
     
-    # Validate required fields
-    if not data.get('filename'):
-        return error('filename is required', code='validation_error', status=400)
+    # Validate the body before touching the database
+    invalid = validation_error(CREATE_SUBMISSION_VALIDATOR, data)
+    if invalid:
+        return invalid
     
     # Check if project exists
     project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
@@ -354,9 +740,10 @@ def create_submission(user_id, project_id):
         return error('Project not found', code='not_found', status=404)
     
     # Generate submission ID
-    submission_id = str(uuid.uuid4())
+    submission_id = new_id()
     
     # Prepare submission data
+    ts = get_timestamp()
     submission_data = {
         'id': submission_id,
         'projectid': project_id,
@@ -364,21 +751,15 @@ def create_submission(user_id, project_id):
         'code': data.get('code', ''),
         'logicrev': data.get('logicrev', []),
         'testcases': data.get('testcases', []),
-        'created_at': get_timestamp(),
-        'updated_at': get_timestamp()
+        'created_at': ts,
+        'updated_at': ts
     }
     
-    # Store submission
-    submission_ref = db.reference(f'users/{user_id}/submissions/{submission_id}')
-    submission_ref.set(submission_data)
-    
-    # Update project's fileids array
-    current_fileids = project.get('fileids', [])
-    current_fileids.append(submission_id)
-    project_ref.update({
-        'fileids': current_fileids,
-        'updated_at': get_timestamp()
-    })
+    # Store submission and add it to the project's fileids in one update
+    updates = fileids_updates(project_id, project, add=[submission_id])
+    updates[f'submissions/{submission_id}'] = submission_data
+    updates[f'projects/{project_id}/updated_at'] = ts
+    db.reference(f'users/{user_id}').update(updates)
     
     return success({'id': submission_id}, meta={'message': 'Submission created successfully'}, status=201)
 
@@ -391,14 +772,7 @@ def get_project_submissions(user_id, project_id):
         return error('Project not found', code='not_found', status=404)
     
     # Get submissions for this project
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    all_submissions = submissions_ref.get() or {}
-    
-    # Filter submissions for this project
-    project_submissions = []
-    for submission_id, submission in all_submissions.items():
-        if submission.get('projectid') == project_id:
-            project_submissions.append(submission)
+    project_submissions = list(query_project_submissions(user_id, project_id).values())
     
     return success(project_submissions)
 
@@ -422,13 +796,17 @@ def get_submission_code(user_id, submission_id):
     
     if not submission:
         return error('Submission not found', code='not_found', status=404)
-    print( "SUBMISSION CODE" , submission.get('code', ''))
     return success({'code': submission.get('code', '')})
 
 @app.route('/users/<user_id>/submissions/<submission_id>', methods=['PUT'])
 def update_submission(user_id, submission_id):
     """Update a submission"""
-    data = request.json
+    data = request.get_json(silent=True)
+    
+    # Validate the body before touching the database
+    invalid = validation_error(UPDATE_SUBMISSION_VALIDATOR, data)
+    if invalid:
+        return invalid
     
     # Add updated timestamp
     data['updated_at'] = get_timestamp()
@@ -450,30 +828,20 @@ def update_submission(user_id, submission_id):
 @app.route('/users/<user_id>/submissions/<submission_id>', methods=['DELETE'])
 def delete_submission(user_id, submission_id):
     """Delete a submission"""
-    submission_ref = db.reference(f'users/{user_id}/submissions/{submission_id}')
-    
     # Check if submission exists
-    submission = submission_ref.get()
-    if not submission:
+    exists, project_id = submission_project_id(user_id, submission_id)
+    if not exists:
         return error('Submission not found', code='not_found', status=404)
     
-    project_id = submission.get('projectid')
-    
-    # Remove submission ID from project's fileids
+    # Delete the submission and drop it from the project's fileids in one update
+    updates = {f'submissions/{submission_id}': None}
     if project_id:
-        project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
-        project = project_ref.get()
-        if project:
-            fileids = project.get('fileids', [])
-            if submission_id in fileids:
-                fileids.remove(submission_id)
-                project_ref.update({
-                    'fileids': fileids,
-                    'updated_at': get_timestamp()
-                })
-    
-    # Delete the submission
-    submission_ref.delete()
+        fileids = read_project_fileids(user_id, project_id)
+        # Only touch projects that still list files, so a deleted project isn't recreated
+        if fileids:
+            updates.update(fileids_updates(project_id, {'fileids': fileids}, remove=[submission_id]))
+            updates[f'projects/{project_id}/updated_at'] = get_timestamp()
+    db.reference(f'users/{user_id}').update(updates)
     
     return success(meta={'message': 'Submission deleted successfully'})
 
@@ -488,35 +856,34 @@ def delete_submissions(user_id):
         return error("No submission IDs provided", code="bad_request", status=400)
 
     deleted_submissions = 0
-
-    for submission_id in ids:
-        # Delete matching submissions
-        submission_ref = db.reference(f'users/{user_id}/submissions/{submission_id}')
-
-        # Check if submission exists; skip missing IDs to allow partial success
-        submission = submission_ref.get()
-        if not submission:
+    updates = {}
+    removed_by_project = {}
+
+    # Look up every submission's project concurrently
+    lookups = EXECUTOR.map(lambda sid: submission_project_id(user_id, sid), ids)
+    for submission_id, (exists, project_id) in zip(ids, lookups):
+        # Skip missing IDs to allow partial success
+        if not exists:
             continue
 
-        project_id = submission.get('projectid')
-
-        # Remove submission ID from project's fileids
+        updates[f'submissions/{submission_id}'] = None
         if project_id:
-            project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
-            project = project_ref.get()
-            if project:
-                fileids = project.get('fileids', [])
-                if submission_id in fileids:
-                    fileids.remove(submission_id)
-                    project_ref.update({
-                        'fileids': fileids,
-                        'updated_at': get_timestamp()
-                    })
-
-        # Delete the submission
-        submission_ref.delete()
+            removed_by_project.setdefault(project_id, set()).add(submission_id)
         deleted_submissions += 1
 
+    # Remove the deleted IDs from each affected project's fileids (one read per project)
+    ts = get_timestamp()
+    project_ids = list(removed_by_project)
+    fileids_by_project = EXECUTOR.map(lambda pid: read_project_fileids(user_id, pid), project_ids)
+    for project_id, fileids in zip(project_ids, fileids_by_project):
+        if not fileids:
+            continue
+        updates.update(fileids_updates(project_id, {'fileids': fileids}, remove=removed_by_project[project_id]))
+        updates[f'projects/{project_id}/updated_at'] = ts
+
+    if updates:
+        db.reference(f'users/{user_id}').update(updates)
+
     if deleted_submissions == 0:
         # Nothing matched the provided IDs – surface this clearly to the client
         return error(
@@ -533,15 +900,30 @@ def delete_submissions(user_id):
 
 # History endpoints
 
+# Number of most recent events returned by the history endpoints unless ?limit= is given
+HISTORY_DEFAULT_LIMIT = 100
+
+def history_limit():
+    """Read ?limit= for the history endpoints; None if it is not a positive integer"""
+    raw = request.args.get('limit')
+    if raw is None:
+        return HISTORY_DEFAULT_LIMIT
+    # Parsed by hand: type=int would quietly turn ?limit=abc into the default
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    return limit if limit > 0 else None
+
 @app.route('/users/<user_id>/history', methods=['GET'])
 def get_user_history(user_id):
-    """Get complete history of all user activities"""
+    """Get the most recent activity across all of a user's projects and submissions"""
+    limit = history_limit()
+    if limit is None:
+        return error('limit must be a positive integer', code='validation_error', status=400)
+
     # Get all projects and submissions
-    projects_ref = db.reference(f'users/{user_id}/projects')
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    
-    projects = projects_ref.get() or {}
-    submissions = submissions_ref.get() or {}
+    projects, submissions = get_user_projects_and_submissions(user_id)
     
     # Create history entries
     history = []
@@ -586,23 +968,27 @@ def get_user_history(user_id):
                 'timestamp': submission.get('updated_at', '')
             })
     
-    # Sort by timestamp (newest first)
-    history.sort(key=lambda x: x['timestamp'], reverse=True)
-    
-    return success(history)
+    # Newest `limit` events first; a bounded heap avoids sorting the full history
+    return success(heapq.nlargest(limit, history, key=itemgetter('timestamp')))
 
 @app.route('/users/<user_id>/projects/<project_id>/history', methods=['GET'])
 def get_project_history(user_id, project_id):
-    """Get history for a specific project"""
+    """Get the most recent activity for a specific project"""
+    limit = history_limit()
+    if limit is None:
+        return error('limit must be a positive integer', code='validation_error', status=400)
+
+    # Read the project and its submissions concurrently
+    project_future = EXECUTOR.submit(db.reference(f'users/{user_id}/projects/{project_id}').get)
+    submissions_future = EXECUTOR.submit(query_project_submissions, user_id, project_id)
+    
     # Check if project exists
-    project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
-    project = project_ref.get()
+    project = project_future.result()
     if not project:
         return error('Project not found', code='not_found', status=404)
     
     # Get all submissions for this project
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    all_submissions = submissions_ref.get() or {}
+    project_submissions = submissions_future.result()
     
     history = []
     
@@ -625,27 +1011,24 @@ def get_project_history(user_id, project_id):
         })
     
     # Add submission events for this project
-    for submission_id, submission in all_submissions.items():
-        if submission.get('projectid') == project_id:
+    for submission_id, submission in project_submissions.items():
+        history.append({
+            'type': 'submission_created',
+            'id': submission_id,
+            'filename': submission.get('filename', ''),
+            'timestamp': submission.get('created_at', '')
+        })
+        
+        if submission.get('updated_at') and submission.get('updated_at') != submission.get('created_at'):
             history.append({
-                'type': 'submission_created',
+                'type': 'submission_updated',
                 'id': submission_id,
                 'filename': submission.get('filename', ''),
-                'timestamp': submission.get('created_at', '')
+                'timestamp': submission.get('updated_at', '')
             })
-            
-            if submission.get('updated_at') and submission.get('updated_at') != submission.get('created_at'):
-                history.append({
-                    'type': 'submission_updated',
-                    'id': submission_id,
-                    'filename': submission.get('filename', ''),
-                    'timestamp': submission.get('updated_at', '')
-                })
     
-    # Sort by timestamp (newest first)
-    history.sort(key=lambda x: x['timestamp'], reverse=True)
-    
-    return success(history)
+    # Newest `limit` events first; a bounded heap avoids sorting the full history
+    return success(heapq.nlargest(limit, history, key=itemgetter('timestamp')))
 
 @app.route("/file-tree", methods=["GET"])
 def file_tree_endpoint():
@@ -662,85 +1045,109 @@ def file_tree_endpoint():
 
     return jsonify(data)
 
+# Number of critical/high issues surfaced by the dashboard summary
+TOP_ISSUES = 3
+
+def _aggregate(projects, submissions, now=None):
+    """
+    Compute the metrics, dashboard and summary aggregates in a single pass
+    over a user's projects and submissions. Each endpoint picks what it needs.
+    """
+    now = now or datetime.now()
+    seven_days_ago = (now - timedelta(days=7)).isoformat()
+    thirty_days_ago = (now - timedelta(days=30)).isoformat()
+
+    severity_counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
+    # First TOP_ISSUES critical and high issues in encounter order; the summary
+    # shows criticals before highs, so the walk stops once enough criticals are found
+    top_issues = {'critical': [], 'high': []}
+    agg = {
+        'total_projects': len(projects),
+        'total_submissions': len(submissions),
+        'total_security_reviews': 0,
+        'total_logic_reviews': 0,
+        'total_test_cases': 0,
+        'projects_last_7_days': 0,
+        'projects_last_30_days': 0,
+        'submissions_last_7_days': 0,
+        'submissions_last_30_days': 0
+    }
+
+    for submission in submissions.values():
+        security_reviews = review_entries(submission.get('securityrev'))
+        agg['total_security_reviews'] += len(security_reviews)
+        for level, count in record_severity_totals(submission).items():
+            severity_counts[level] += count
+        for entry in security_reviews:
+            if len(top_issues['critical']) >= TOP_ISSUES:
+                break
+            # Only walk reviews that can still contribute critical/high issues
+            counts = entry.get('severity_counts') if isinstance(entry, dict) else None
+            if isinstance(counts, dict) and not counts.get('critical') and \
+                    (not counts.get('high') or len(top_issues['high']) >= TOP_ISSUES):
+                continue
+            for file_data, issue in iter_security_issues([entry]):
+                level = (issue.get('severity') or {}).get('level', '')
+                bucket = top_issues.get(level)
+                if bucket is None or len(bucket) >= TOP_ISSUES:
+                    continue
+                bucket.append({
+                    'filename': file_data.get('filename', ''),
+                    'line': issue.get('line', 0),
+                    'feedback': issue.get('feedback', ''),
+                    'severity': level,
+                    'submission_id': submission.get('id', '')
+                })
+                if len(top_issues['critical']) >= TOP_ISSUES:
+                    break
+        agg['total_logic_reviews'] += len(review_entries(submission.get('logicrev')))
+        agg['total_test_cases'] += len(submission.get('testcases') or [])
+
+        created_at = submission.get('created_at', '')
+        if created_at >= thirty_days_ago:
+            agg['submissions_last_30_days'] += 1
+            if created_at >= seven_days_ago:
+                agg['submissions_last_7_days'] += 1
+
+    for project in projects.values():
+        created_at = project.get('created_at', '')
+        if created_at >= thirty_days_ago:
+            agg['projects_last_30_days'] += 1
+            if created_at >= seven_days_ago:
+                agg['projects_last_7_days'] += 1
+
+    agg['severity_counts'] = severity_counts
+    agg['critical_issues'] = (top_issues['critical'] + top_issues['high'])[:TOP_ISSUES]
+    # Partial selection instead of full sorts: 5 projects, 10 submissions
+    agg['recent_projects'] = heapq.nlargest(5, projects.items(), key=lambda kv: kv[1].get('updated_at', ''))
+    agg['recent_submissions'] = heapq.nlargest(10, submissions.items(), key=lambda kv: kv[1].get('updated_at', ''))
+    return agg
+
 # Metrics endpoints
 
 @app.route('/users/<user_id>/metrics', methods=['GET'])
 def get_user_metrics(user_id):
     """Get comprehensive metrics for a user"""
-    projects_ref = db.reference(f'users/{user_id}/projects')
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    
-    projects = projects_ref.get() or {}
-    submissions = submissions_ref.get() or {}
-    
-    # Calculate metrics
-    total_projects = len(projects)
-    total_submissions = len(submissions)
-    
-    # Count security and logic reviews
-    total_security_reviews = 0
-    total_logic_reviews = 0
-    total_test_cases = 0
-    
-    # Count issues by severity
-    severity_counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
-    
-    for submission in submissions.values():
-        # Count reviews
-        if submission.get('securityrev'):
-            total_security_reviews += len(submission['securityrev'])
-            # Parse security reviews for severity counts
-            for review in submission['securityrev']:
-                try:
-                    if isinstance(review, str):
-                        import json
-                        review_data = json.loads(review)
-                        for file_data in review_data.get('files', []):
-                            for issue in file_data.get('issues', []):
-                                severity = issue.get('severity', {}).get('level', 'low')
-                                if severity in severity_counts:
-                                    severity_counts[severity] += 1
-                except:
-                    pass
-        
-        if submission.get('logicrev'):
-            total_logic_reviews += len(submission['logicrev'])
-        
-        if submission.get('testcases'):
-            total_test_cases += len(submission['testcases'])
+    projects, submissions = get_user_projects_and_submissions(user_id)
+    agg = _aggregate(projects, submissions)
     
     # Calculate average issues per submission
     avg_issues_per_submission = 0
-    if total_submissions > 0:
-        total_issues = sum(severity_counts.values())
-        avg_issues_per_submission = total_issues / total_submissions
-    
-    # Get recent activity (last 30 days)
-    from datetime import datetime, timedelta
-    thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-    
-    recent_projects = 0
-    recent_submissions = 0
-    
-    for project in projects.values():
-        if project.get('created_at', '') >= thirty_days_ago:
-            recent_projects += 1
-    
-    for submission in submissions.values():
-        if submission.get('created_at', '') >= thirty_days_ago:
-            recent_submissions += 1
+    if agg['total_submissions'] > 0:
+        total_issues = sum(agg['severity_counts'].values())
+        avg_issues_per_submission = total_issues / agg['total_submissions']
     
     metrics = {
-        'total_projects': total_projects,
-        'total_submissions': total_submissions,
-        'total_security_reviews': total_security_reviews,
-        'total_logic_reviews': total_logic_reviews,
-        'total_test_cases': total_test_cases,
-        'severity_distribution': severity_counts,
+        'total_projects': agg['total_projects'],
+        'total_submissions': agg['total_submissions'],
+        'total_security_reviews': agg['total_security_reviews'],
+        'total_logic_reviews': agg['total_logic_reviews'],
+        'total_test_cases': agg['total_test_cases'],
+        'severity_distribution': agg['severity_counts'],
         'avg_issues_per_submission': round(avg_issues_per_submission, 2),
         'recent_activity': {
-            'projects_last_30_days': recent_projects,
-            'submissions_last_30_days': recent_submissions
+            'projects_last_30_days': agg['projects_last_30_days'],
+            'submissions_last_30_days': agg['submissions_last_30_days']
         }
     }
     
@@ -749,20 +1156,17 @@ def get_user_metrics(user_id):
 @app.route('/users/<user_id>/projects/<project_id>/metrics', methods=['GET'])
 def get_project_metrics(user_id, project_id):
     """Get metrics for a specific project"""
+    # Read the project and its submissions concurrently
+    project_future = EXECUTOR.submit(db.reference(f'users/{user_id}/projects/{project_id}').get)
+    submissions_future = EXECUTOR.submit(query_project_submissions, user_id, project_id)
+    
     # Check if project exists
-    project_ref = db.reference(f'users/{user_id}/projects/{project_id}')
-    project = project_ref.get()
+    project = project_future.result()
     if not project:
         return error('Project not found', code='not_found', status=404)
     
     # Get submissions for this project
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    all_submissions = submissions_ref.get() or {}
-    
-    project_submissions = []
-    for submission_id, submission in all_submissions.items():
-        if submission.get('projectid') == project_id:
-            project_submissions.append(submission)
+    project_submissions = list(submissions_future.result().values())
     
     # Calculate project-specific metrics
     total_submissions = len(project_submissions)
@@ -774,23 +1178,13 @@ def get_project_metrics(user_id, project_id):
     
     for submission in project_submissions:
         if submission.get('securityrev'):
-            total_security_reviews += len(submission['securityrev'])
-            # Parse security reviews for severity counts
-            for review in submission['securityrev']:
-                try:
-                    if isinstance(review, str):
-                        import json
-                        review_data = json.loads(review)
-                        for file_data in review_data.get('files', []):
-                            for issue in file_data.get('issues', []):
-                                severity = issue.get('severity', {}).get('level', 'low')
-                                if severity in severity_counts:
-                                    severity_counts[severity] += 1
-                except:
-                    pass
+            total_security_reviews += len(review_entries(submission['securityrev']))
+            # Count issues in security reviews by severity
+            for level, count in record_severity_totals(submission).items():
+                severity_counts[level] += count
         
         if submission.get('logicrev'):
-            total_logic_reviews += len(submission['logicrev'])
+            total_logic_reviews += len(review_entries(submission['logicrev']))
         
         if submission.get('testcases'):
             total_test_cases += len(submission['testcases'])
@@ -821,73 +1215,43 @@ def get_project_metrics(user_id, project_id):
 @app.route('/users/<user_id>/dashboard', methods=['GET'])
 def get_user_dashboard(user_id):
     """Get comprehensive dashboard data for a user"""
-    projects_ref = db.reference(f'users/{user_id}/projects')
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
+    projects, submissions = get_user_projects_and_submissions(user_id)
+    agg = _aggregate(projects, submissions)
     
-    projects = projects_ref.get() or {}
-    submissions = submissions_ref.get() or {}
-    
-    # Get recent projects (last 5)
-    recent_projects = []
-    for project_id, project in projects.items():
-        recent_projects.append({
-            'id': project_id,
-            'name': project.get('project_name', ''),
-            'description': project.get('project_desc', ''),
-            'submission_count': len(project.get('fileids', [])),
-            'created_at': project.get('created_at', ''),
-            'updated_at': project.get('updated_at', '')
-        })
-    
-    # Sort by updated_at (most recent first) and take top 5
-    recent_projects.sort(key=lambda x: x['updated_at'], reverse=True)
-    recent_projects = recent_projects[:5]
-    
-    # Get recent submissions (last 10)
-    recent_submissions = []
-    for submission_id, submission in submissions.items():
-        recent_submissions.append({
-            'id': submission_id,
-            'project_id': submission.get('projectid', ''),
-            'filename': submission.get('filename', ''),
-            'created_at': submission.get('created_at', ''),
-            'updated_at': submission.get('updated_at', ''),
-            'has_security_review': len(submission.get('securityrev', [])) > 0,
-            'has_logic_review': len(submission.get('logicrev', [])) > 0,
-            'has_test_cases': len(submission.get('testcases', [])) > 0
-        })
-    
-    # Sort by updated_at (most recent first) and take top 10
-    recent_submissions.sort(key=lambda x: x['updated_at'], reverse=True)
-    recent_submissions = recent_submissions[:10]
-    
-    # Calculate quick stats
-    total_projects = len(projects)
-    total_submissions = len(submissions)
-    
-    # Count reviews
-    total_security_reviews = sum(len(s.get('securityrev', [])) for s in submissions.values())
-    total_logic_reviews = sum(len(s.get('logicrev', [])) for s in submissions.values())
-    total_test_cases = sum(len(s.get('testcases', [])) for s in submissions.values())
-    
-    # Get activity in last 7 days
-    from datetime import datetime, timedelta
-    seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
+    # Recent projects (last 5 by updated_at)
+    recent_projects = [{
+        'id': project_id,
+        'name': project.get('project_name', ''),
+        'description': project.get('project_desc', ''),
+        'submission_count': len(project.get('fileids', [])),
+        'created_at': project.get('created_at', ''),
+        'updated_at': project.get('updated_at', '')
+    } for project_id, project in agg['recent_projects']]
     
-    recent_activity = {
-        'projects_created': sum(1 for p in projects.values() if p.get('created_at', '') >= seven_days_ago),
-        'submissions_created': sum(1 for s in submissions.values() if s.get('created_at', '') >= seven_days_ago)
-    }
+    # Recent submissions (last 10 by updated_at)
+    recent_submissions = [{
+        'id': submission_id,
+        'project_id': submission.get('projectid', ''),
+        'filename': submission.get('filename', ''),
+        'created_at': submission.get('created_at', ''),
+        'updated_at': submission.get('updated_at', ''),
+        'has_security_review': bool(submission.get('securityrev')),
+        'has_logic_review': bool(submission.get('logicrev')),
+        'has_test_cases': bool(submission.get('testcases'))
+    } for submission_id, submission in agg['recent_submissions']]
     
     dashboard_data = {
         'quick_stats': {
-            'total_projects': total_projects,
-            'total_submissions': total_submissions,
-            'total_security_reviews': total_security_reviews,
-            'total_logic_reviews': total_logic_reviews,
-            'total_test_cases': total_test_cases
+            'total_projects': agg['total_projects'],
+            'total_submissions': agg['total_submissions'],
+            'total_security_reviews': agg['total_security_reviews'],
+            'total_logic_reviews': agg['total_logic_reviews'],
+            'total_test_cases': agg['total_test_cases']
+        },
+        'recent_activity': {
+            'projects_created': agg['projects_last_7_days'],
+            'submissions_created': agg['submissions_last_7_days']
         },
-        'recent_activity': recent_activity,
         'recent_projects': recent_projects,
         'recent_submissions': recent_submissions
     }
@@ -897,79 +1261,63 @@ def get_user_dashboard(user_id):
 @app.route('/users/<user_id>/dashboard/summary', methods=['GET'])
 def get_dashboard_summary(user_id):
     """Get a quick summary for the dashboard"""
-    projects_ref = db.reference(f'users/{user_id}/projects')
-    submissions_ref = db.reference(f'users/{user_id}/submissions')
-    
-    projects = projects_ref.get() or {}
-    submissions = submissions_ref.get() or {}
-    
-    # Calculate summary stats
-    total_projects = len(projects)
-    total_submissions = len(submissions)
-    
-    # Count issues by severity across all submissions
-    severity_counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
-    
-    for submission in submissions.values():
-        for review in submission.get('securityrev', []):
-            try:
-                if isinstance(review, str):
-                    import json
-                    review_data = json.loads(review)
-                    for file_data in review_data.get('files', []):
-                        for issue in file_data.get('issues', []):
-                            severity = issue.get('severity', {}).get('level', 'low')
-                            if severity in severity_counts:
-                                severity_counts[severity] += 1
-            except:
-                pass
-    
-    # Get most critical issues (top 3)
-    critical_issues = []
-    for submission in submissions.values():
-        for review in submission.get('securityrev', []):
-            try:
-                if isinstance(review, str):
-                    import json
-                    review_data = json.loads(review)
-                    for file_data in review_data.get('files', []):
-                        for issue in file_data.get('issues', []):
-                            if issue.get('severity', {}).get('level') in ['critical', 'high']:
-                                critical_issues.append({
-                                    'filename': file_data.get('filename', ''),
-                                    'line': issue.get('line', 0),
-                                    'feedback': issue.get('feedback', ''),
-                                    'severity': issue.get('severity', {}).get('level', ''),
-                                    'submission_id': submission.get('id', '')
-                                })
-            except:
-                pass
-    
-    # Sort by severity and take top 3
-    critical_issues.sort(key=lambda x: {'critical': 4, 'high': 3, 'medium': 2, 'low': 1}.get(x['severity'], 0), reverse=True)
-    critical_issues = critical_issues[:3]
+    projects, submissions = get_user_projects_and_submissions(user_id)
+    agg = _aggregate(projects, submissions)
     
     summary = {
-        'total_projects': total_projects,
-        'total_submissions': total_submissions,
-        'total_issues': sum(severity_counts.values()),
-        'severity_breakdown': severity_counts,
-        'critical_issues': critical_issues
+        'total_projects': agg['total_projects'],
+        'total_submissions': agg['total_submissions'],
+        'total_issues': sum(agg['severity_counts'].values()),
+        'severity_breakdown': agg['severity_counts'],
+        'critical_issues': agg['critical_issues']
     }
     
     return success(summary)
 
 # Common Route handler for LLM reviews 
 
+def clean_llm_text(text):
+    """Strip markdown fences and surrounding prose from an LLM reply (str or bytes), leaving the JSON object"""
+    if isinstance(text, bytes):
+        fence, json_fence, open_brace, close_brace = b'```', b'```json', b'{', b'}'
+    else:
+        fence, json_fence, open_brace, close_brace = '```', '```json', '{', '}'
+
+    # Strip markdown code fences if present
+    text = text.strip()
+    if text.startswith(json_fence):
+        text = text[7:]
+        logger.debug("[CLEAN] Removed ```json prefix")
+    elif text.startswith(fence):
+        text = text[3:]
+        logger.debug("[CLEAN] Removed ``` prefix")
+
+    # Find and remove closing ``` and any text after it
+    closing_fence = text.find(fence)
+    if closing_fence != -1:
+        text = text[:closing_fence]
+        logger.debug("[CLEAN] Removed ``` at position %d", closing_fence)
+
+    text = text.strip()
+
+    # Extract JSON object if LLM added explanatory text before/after
+    first_brace = text.find(open_brace)
+    last_brace = text.rfind(close_brace)
+
+    if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
+        text = text[first_brace:last_brace + 1]
+        logger.debug("[CLEAN] Extracted JSON from position %d to %d", first_brace, last_brace)
+    else:
+        logger.warning("[CLEAN] No braces found in LLM response: first=%d, last=%d", first_brace, last_brace)
+
+    text = text.strip()
+    logger.debug("[CLEAN] Final cleaned response: %d chars", len(text))
+    return text
+
+
 def handle_llm_review(review_type, user_id, project_or_submission_id, data):
     """Handle LLM review requests"""
 
-    PROMPT_PATHS = {
-        "logic": "prompts/logic_prompt.txt",
-        "testing": "prompts/testing_prompt.txt",
-        "security": "prompts/security_prompt.txt"
-    }
-
     if review_type not in PROMPT_PATHS:
         return {"success": False, "error": "Invalid review type"}
 
@@ -988,7 +1336,7 @@ def handle_llm_review(review_type, user_id, project_or_submission_id, data):
             file_data['code'] = cleaned_code
 
         # Convert the files array to JSON string for the prompt
-        code = json.dumps(files_data, indent=2)
+        code = dumps_json(files_data, indent=True)
         
     else:
         # For logic and testing reviews, data should have code
@@ -1007,81 +1355,217 @@ def handle_llm_review(review_type, user_id, project_or_submission_id, data):
         return {"success": False, "error": "LLM not available on server"}
 
     try:   
-        # Load the correct prompt template for the review type
-        prompt_template = load_prompt(PROMPT_PATHS[review_type])
-
-        # Inject the code into the template
-        prompt = prompt_template.replace('{code}', code)
+        # Inject the code into the prompt template for the review type
+        before, after = get_prompt_parts(review_type)
+        prompt = f"{before}{code}{after}"
 
         # Generate response from LLM
-        llm_response = llm.generate_response(user_prompt=prompt)
-        print(f"[RAW] Original LLM response type: {type(llm_response)}")
-        print(f"[RAW] First 200 chars: {str(llm_response)[:200]}")
+        with acquire_llm() as llm_client:
+            llm_response = llm_client.generate_response(user_prompt=prompt)
+        logger.debug("[RAW] Original LLM response type: %s", type(llm_response))
+        logger.debug("[RAW] LLM response: %.200s", llm_response)
 
         # If LLM returns a dict/list, pass it through as JSON-compatible
         if isinstance(llm_response, (dict, list)):
-            print("[CLEAN] LLM returned dict/list directly")
+            logger.debug("[CLEAN] LLM returned dict/list directly")
             return llm_response
 
-        # Convert to string
-        if hasattr(llm_response, 'system_prompt'):
+        # Byte buffers are cleaned and parsed as bytes (orjson reads them
+        # directly), so only streamed chunk lists get joined into a str
+        if isinstance(llm_response, (bytes, bytearray)):
+            response_text = bytes(llm_response)
+        elif hasattr(llm_response, 'system_prompt'):
             try:
-                response_str = ''.join(llm_response.system_prompt)
+                response_text = ''.join(llm_response.system_prompt)
             except Exception:
-                response_str = str(llm_response)
-        elif isinstance(llm_response, (bytes, bytearray)):
-            try:
-                response_str = llm_response.decode('utf-8', errors='ignore')
-            except Exception:
-                response_str = str(llm_response)
-        else:
-            response_str = str(llm_response)
-
-        print(f"[CLEAN] After string conversion: {len(response_str)} chars")
-
-        # Strip markdown code fences if present
-        response_str = response_str.strip()
-        if response_str.startswith('```json'):
-            response_str = response_str[7:]
-            print("[CLEAN] Removed ```json prefix")
-        elif response_str.startswith('```'):
-            response_str = response_str[3:]
-            print("[CLEAN] Removed ``` prefix")
-        
-        # Find and remove closing ``` and any text after it
-        closing_fence = response_str.find('```')
-        if closing_fence != -1:
-            response_str = response_str[:closing_fence]
-            print(f"[CLEAN] Removed ``` at position {closing_fence}")
-        
-        response_str = response_str.strip()
-        
-        # Extract JSON object if LLM added explanatory text before/after
-        first_brace = response_str.find('{')
-        last_brace = response_str.rfind('}')
-        
-        if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-            response_str = response_str[first_brace:last_brace + 1]
-            print(f"[CLEAN] Extracted JSON from position {first_brace} to {last_brace}")
+                response_text = str(llm_response)
         else:
-            print(f"[CLEAN] WARNING: No braces found! first={first_brace}, last={last_brace}")
-        
-        response_str = response_str.strip()
-        print(f"[CLEAN] Final cleaned response: {len(response_str)} chars")
-        print(f"[CLEAN] First 100 chars: {response_str[:100]}")
+            response_text = str(llm_response)
 
-        return response_str
+        logger.debug("[CLEAN] Raw response: %d chars", len(response_text))
+        return clean_llm_text(response_text)
         
     
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+class ReviewError(Exception):
+    """LLM review failure carrying the API error code and HTTP status to report"""
+    def __init__(self, message, code='llm_error', status=400, detail=None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.detail = detail
+
+
+def parse_llm_review(llm_review, field_name):
+    """Normalize the output of handle_llm_review into a review object; raises ReviewError"""
+    if isinstance(llm_review, tuple):
+        # Legacy safety net; convert to error if present
+        try:
+            resp, status_code = llm_review
+            detail = getattr(resp, 'json', lambda: str(resp))()
+        except Exception:
+            raise ReviewError('LLM error', status=500)
+        raise ReviewError('LLM error', status=status_code, detail=detail)
+    if isinstance(llm_review, dict):
+        # Treat dict as success unless it explicitly signals an error
+        if llm_review.get('success') is False or 'error' in llm_review:
+            raise ReviewError(llm_review.get('error', 'LLM error'))
+        return llm_review
+    if isinstance(llm_review, (bytes, bytearray)):
+        # LLM output isn't guaranteed to be valid UTF-8; drop undecodable bytes
+        llm_review = llm_review.decode('utf-8', errors='ignore')
+    else:
+        llm_review = str(llm_review)
+    try:
+        return loads_json(llm_review)
+    except Exception as e:
+        logger.warning("[%s] JSON parse failed: %s", field_name, e)
+        logger.debug("[%s] Attempted to parse: %.500s", field_name, llm_review)
+        raise ReviewError('Invalid JSON returned from LLM', code='llm_invalid_json', status=500, detail=str(e))
+
+
+def review_entry(field_name, llm_review_obj):
+    """Build the stored history entry for a review object"""
+    entry = {"review": llm_review_obj}
+    if field_name == 'securityrev':
+        # Count severities once at write time so read endpoints don't re-walk every review
+        entry["severity_counts"] = count_severities([entry])
+    return entry
+
+
+def store_review(ref, field_name, llm_review_obj):
+    """Append a review object to the record's review history under field_name"""
+    entry = review_entry(field_name, llm_review_obj)
+
+    # Append new review; push() is atomic, so concurrent reviews don't clobber each other
+    ref.child(field_name).push(entry)
+
+
+# Reviews are persisted behind the response: the client gets the review as
+# soon as the LLM returns, and a single writer thread appends it to Firebase
+# (one worker keeps appends in request order).
+# Handlers queue reviews and schedule a flush; whichever flush runs first
+# writes everything queued so far in one multi-path update, so concurrent
+# reviews share a round-trip and later flushes find nothing left to do.
+# A failed batch is queued again, up to REVIEW_WRITE_ATTEMPTS tries with a
+# growing pause, so a brief Firebase outage doesn't lose reviews; at most
+# REVIEW_RETRY_LIMIT reviews are held for retry, and writes the database
+# rules deny are dropped without retrying. Reviews of
+# records deleted before their write are dropped. Until the flush lands
+# (normally well under a second), a read of the record doesn't show the review.
+REVIEW_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='review-writes')
+REVIEW_WRITE_ATTEMPTS = 3
+REVIEW_RETRY_DELAY = 2.0  # seconds, multiplied by the attempt number
+REVIEW_RETRY_LIMIT = 500
+_pending_reviews = deque()
+
+def queue_review_write(user_id, ref, field_name, llm_review_obj):
+    # The key is fixed here so a retried write lands on the same entry
+    _pending_reviews.append((user_id, ref, field_name, new_id(), llm_review_obj, 1))
+    REVIEW_WRITER.submit(write_pending_reviews)
+
+
+def retry_review_writes(batch, exc=None):
+    """
+    Queue a failed batch again ahead of newer reviews. Reviews out of attempts
+    or beyond REVIEW_RETRY_LIMIT, and every review of a batch the rules denied
+    (exc.code PERMISSION_DENIED), are logged and dropped.
+    """
+    if getattr(exc, 'code', None) == 'PERMISSION_DENIED':
+        logger.error("[REVIEWS] Dropping %d review(s): write denied", len(batch))
+        return
+    retry = [item[:-1] + (item[-1] + 1,) for item in batch if item[-1] < REVIEW_WRITE_ATTEMPTS]
+    retry = retry[:max(REVIEW_RETRY_LIMIT - len(_pending_reviews), 0)]
+    if len(retry) < len(batch):
+        logger.error("[REVIEWS] Dropping %d review(s) that can't be retried", len(batch) - len(retry))
+    if not retry:
+        return
+    _pending_reviews.extendleft(reversed(retry))
+    delay = REVIEW_RETRY_DELAY * max(item[-1] - 1 for item in retry)
+    timer = threading.Timer(delay, REVIEW_WRITER.submit, (write_pending_reviews,))
+    timer.daemon = True
+    timer.start()
+
+
+def write_pending_reviews():
+    batch = []
+    while _pending_reviews:
+        batch.append(_pending_reviews.popleft())
+    if not batch:
+        return
+
+    user_ids = {item[0] for item in batch}
+    try:
+        # A record deleted since its review was queued (or between retries) is
+        # skipped; writing the review path would re-create it holding only that review
+        record_paths = {item[1].path.strip('/') for item in batch}
+        live = {path for path in record_paths if db.reference(path).get(shallow=True)}
+        if len(live) < len(record_paths):
+            skipped = [item for item in batch if item[1].path.strip('/') not in live]
+            logger.info("[REVIEWS] Dropping %d review(s) of deleted records", len(skipped))
+            batch = [item for item in batch if item[1].path.strip('/') in live]
+
+        updates = {}
+        for _user_id, ref, field_name, key, llm_review_obj, _attempt in batch:
+            # Locally generated push-style keys let every append share one update
+            updates[f'{ref.path.strip("/")}/{field_name}/{key}'] = review_entry(field_name, llm_review_obj)
+        if updates:
+            db.reference('/').update(updates)
+    except Exception as e:
+        logger.exception("[REVIEWS] Failed to store %d review(s)", len(batch))
+        retry_review_writes(batch, e)
+    finally:
+        # Reads cached while the writes were queued must not outlive them
+        for user_id in user_ids:
+            invalidate_user_cache(user_id)
+
+
+def finalize_review(llm_review, user_id, ref, field_name, response_meta):
+    """
+    Normalize the output of handle_llm_review, queue it for appending to the
+    record's review history under field_name and build the API response.
+    """
+    try:
+        llm_review_obj = parse_llm_review(llm_review, field_name)
+    except ReviewError as e:
+        return error(str(e), code=e.code, detail=e.detail, status=e.status)
+    queue_review_write(user_id, ref, field_name, llm_review_obj)
+    return success({**response_meta, "response": llm_review_obj})
+
+
+def run_review_job(review_type, user_id, target_id, data, ref_path, field_name, response_meta):
+    """Background variant of a review request; returns the same data as the synchronous response"""
+    llm_review = handle_llm_review(review_type, user_id, target_id, data)
+    llm_review_obj = parse_llm_review(llm_review, field_name)
+    store_review(db.reference(ref_path), field_name, llm_review_obj)
+    invalidate_user_cache(user_id)
+    return {**response_meta, "response": llm_review_obj}
+
+
+def wants_async():
+    """True when the client asked for a review to run as a background job (?async=true)"""
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def start_review_job(user_id, *args):
+    job_id = start_job(user_id, 'reviews', run_review_job, *args)
+    return success({'job_id': job_id, 'status': 'queued'}, meta={'message': 'Review started'}, status=202)
+
+
 # Route for logic review
 @app.route('/users/<user_id>/submissions/<submission_id>/logic-review', methods=['POST'])
 @limiter.limit("1 per 5 seconds") 
 def logic_review(user_id, submission_id):
-    """Generate logic review for a submission"""
+    """
+    Generate logic review for a submission.
+    The review is returned before it is stored: it appears in the submission's
+    logicrev once the review writer flushes it (see REVIEW_WRITER), and is
+    dropped if the submission is deleted first. With ?async=true the job is
+    done only after the review is stored.
+    """
     try:
         ref = db.reference(f'users/{user_id}/submissions/{submission_id}')
 
@@ -1092,73 +1576,36 @@ def logic_review(user_id, submission_id):
 
         # Get response from llm
         request_data = request.get_json()
-        print(f"[LOGIC REVIEW] Request data: {request_data}")
+        logger.debug("[LOGIC REVIEW] Request data: %s", request_data)
+        if wants_async():
+            return start_review_job(user_id, "logic", user_id, submission_id, request_data, ref.path, 'logicrev', {
+                "review_type": "logic",
+                "user_id": user_id,
+                "submission_id": submission_id
+            })
         llm_review = handle_llm_review("logic", user_id, submission_id, request_data)
-        print(f"[LOGIC REVIEW] LLM review response: {llm_review}")
+        logger.debug("[LOGIC REVIEW] LLM review response: %s", llm_review)
     except Exception as e:
-        print(f"[LOGIC REVIEW ERROR] Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[LOGIC REVIEW ERROR] Exception: %s", e)
         return error(f'Internal server error: {str(e)}', code='internal_error', status=500)
 
-    # Normalize LLM output and handle errors consistently
-    if isinstance(llm_review, tuple):
-        # Legacy safety net; convert to error if present
-        try:
-            resp, status_code = llm_review
-            return error('LLM error', code='llm_error', detail=getattr(resp, 'json', lambda: str(resp))(), status=status_code)
-        except Exception:
-            return error('LLM error', code='llm_error', status=500)
-    if isinstance(llm_review, dict):
-        # Treat dict as success unless it explicitly signals an error
-        if llm_review.get('success') is False or 'error' in llm_review:
-            return error(llm_review.get('error', 'LLM error'), code='llm_error', status=400)
-        llm_review_obj = llm_review
-        # Append new review and return success
-        logic_rev = submission_data.get('logicrev', [])
-        logic_rev.append({
-            "review": llm_review_obj    
-        })
-        ref.update({
-            "logicrev": logic_rev
-        })
-        return success({
-            "review_type": "logic",
-            "user_id": user_id,
-            "submission_id": submission_id,
-            "response": llm_review_obj
-        })
-    if isinstance(llm_review, (bytes, bytearray)):
-        try:
-            llm_review = llm_review.decode('utf-8', errors='ignore')
-        except Exception:
-            llm_review = str(llm_review)
-    try:
-        llm_review_obj = json.loads(str(llm_review))
-    except Exception as e:
-        return error('Invalid JSON returned from LLM', code='llm_invalid_json', detail=str(e), status=500)
-
-    # Append new review
-    logic_rev = submission_data.get('logicrev', [])
-    logic_rev.append({
-        "review": llm_review_obj    
-    })
-    ref.update({
-        "logicrev": logic_rev
-    })
-
-    return success({
+    return finalize_review(llm_review, user_id, ref, 'logicrev', {
         "review_type": "logic",
         "user_id": user_id,
-        "submission_id": submission_id,
-        "response": llm_review_obj
+        "submission_id": submission_id
     })
 
 # Route for testing review
 @app.route('/users/<user_id>/submissions/<submission_id>/testing-review', methods=['POST'])
 @limiter.limit("1 per 5 seconds") 
 def testing_review(user_id, submission_id):
-    """Generate test cases for a submission"""
+    """
+    Generate test cases for a submission.
+    The review is returned before it is stored: it appears in the submission's
+    testingrev once the review writer flushes it (see REVIEW_WRITER), and is
+    dropped if the submission is deleted first. With ?async=true the job is
+    done only after the review is stored.
+    """
     try:
         ref = db.reference(f'users/{user_id}/submissions/{submission_id}')
         
@@ -1169,74 +1616,36 @@ def testing_review(user_id, submission_id):
 
         # Get response from llm
         request_data = request.get_json()
-        print(f"[TESTING REVIEW] Request data: {request_data}")
+        logger.debug("[TESTING REVIEW] Request data: %s", request_data)
+        if wants_async():
+            return start_review_job(user_id, "testing", user_id, submission_id, request_data, ref.path, 'testingrev', {
+                "review_type": "testing",
+                "user_id": user_id,
+                "submission_id": submission_id
+            })
         llm_review = handle_llm_review("testing", user_id, submission_id, request_data)
-        print(f"[TESTING REVIEW] LLM review response type: {type(llm_review)}")
+        logger.debug("[TESTING REVIEW] LLM review response type: %s", type(llm_review))
     except Exception as e:
-        print(f"[TESTING REVIEW ERROR] Exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[TESTING REVIEW ERROR] Exception: %s", e)
         return error(f'Internal server error: {str(e)}', code='internal_error', status=500)
 
-    # Normalize LLM output and handle errors consistently
-    if isinstance(llm_review, tuple):
-        try:
-            resp, status_code = llm_review
-            return error('LLM error', code='llm_error', detail=getattr(resp, 'json', lambda: str(resp))(), status=status_code)
-        except Exception:
-            return error('LLM error', code='llm_error', status=500)
-    if isinstance(llm_review, dict):
-        # Treat dict as success unless it explicitly signals an error
-        if llm_review.get('success') is False or 'error' in llm_review:
-            return error(llm_review.get('error', 'LLM error'), code='llm_error', status=400)
-        llm_review_obj = llm_review
-        # Append new review and return success
-        test_rev = submission_data.get('testingrev', [])
-        test_rev.append({
-            "review": llm_review_obj
-        })
-        ref.update({
-            "testingrev": test_rev
-        })
-        return success({
-            "review_type": "testing",
-            "user_id": user_id,
-            "submission_id": submission_id,
-            "response": llm_review_obj
-        })
-    if isinstance(llm_review, (bytes, bytearray)):
-        try:
-            llm_review = llm_review.decode('utf-8', errors='ignore')
-        except Exception:
-            llm_review = str(llm_review)
-    try:
-        llm_review_obj = json.loads(str(llm_review))
-    except Exception as e:
-        print(f"[TESTING REVIEW ERROR] JSON parse failed: {str(e)}")
-        print(f"[TESTING REVIEW ERROR] Attempted to parse: {str(llm_review)[:500]}")
-        return error('Invalid JSON returned from LLM', code='llm_invalid_json', detail=str(e), status=500)
-
-    # Append new review 
-    test_rev = submission_data.get('testingrev', [])
-    test_rev.append({
-        "review": llm_review_obj
-    })
-    ref.update({
-        "testingrev": test_rev
-    })
-
-    return success({
+    return finalize_review(llm_review, user_id, ref, 'testingrev', {
         "review_type": "testing",
         "user_id": user_id,
-        "submission_id": submission_id,
-        "response": llm_review_obj
+        "submission_id": submission_id
     })
 
 # Route for security review 
 @app.route('/users/<user_id>/projects/<project_id>/security-review', methods=['POST'])
 @limiter.limit("1 per 5 seconds") 
 def security_review(user_id, project_id):
-
+    """
+    Generate a security review of a project's files.
+    The review is returned before it is stored: it appears in the project's
+    securityrev once the review writer flushes it (see REVIEW_WRITER), and is
+    dropped if the project is deleted first. With ?async=true the job is done
+    only after the review is stored.
+    """
     ref = db.reference(f'users/{user_id}/projects/{project_id}')
 
     # Function to update the database with the newest submission needs implementation
@@ -1247,74 +1656,64 @@ def security_review(user_id, project_id):
         return error('Project not found', code='not_found', status=404)
     
     #extract a list of fileids to be sent to LLM 
-    file_ids = project_data.get('fileids', [])
-
-    # Extract code, filename for each file ID
-    data = []
-    for file_id in file_ids:
-        submission_ref = db.reference(f'users/{user_id}/submissions/{file_id}')
-        submission_data = submission_ref.get()
-        if submission_data:
-            data.append({
-            'filename': submission_data.get('filename', ''),
-            'code': submission_data.get('code', '')
-        })
-    
-    llm_review = handle_llm_review("security", user_id, project_id, data)
+    file_ids = project_file_ids(project_data)
 
-    # Normalize LLM output and handle errors consistently
-    if isinstance(llm_review, tuple):
-        try:
-            resp, status_code = llm_review
-            return error('LLM error', code='llm_error', detail=getattr(resp, 'json', lambda: str(resp))(), status=status_code)
-        except Exception:
-            return error('LLM error', code='llm_error', status=500)
-    if isinstance(llm_review, dict):
-        # Treat dict as success unless it explicitly signals an error
-        if llm_review.get('success') is False or 'error' in llm_review:
-            return error(llm_review.get('error', 'LLM error'), code='llm_error', status=400)
-        llm_review_obj = llm_review
-        # Append new review and return success
-        sec_rev = project_data.get('securityrev', [])
-        sec_rev.append({
-            "review": llm_review_obj
-        })
-        ref.update({
-            "securityrev": sec_rev
-        })  
-        return success({
+    # Extract code, filename for each file ID (one indexed query instead of a read per file)
+    project_submissions = query_project_submissions(user_id, project_id)
+    data = [
+        {'filename': submission.get('filename', ''), 'code': submission.get('code', '')}
+        for submission in map(project_submissions.get, file_ids) if submission
+    ]
+    
+    if wants_async():
+        return start_review_job(user_id, "security", user_id, project_id, data, ref.path, 'securityrev', {
             "review_type": "security",
             "user_id": user_id,
-            "project_id": project_id,
-            "response": llm_review_obj
+            "project_id": project_id
         })
-    if isinstance(llm_review, (bytes, bytearray)):
-        try:
-            llm_review = llm_review.decode('utf-8', errors='ignore')
-        except Exception:
-            llm_review = str(llm_review)
-    try:
-        llm_review_obj = json.loads(str(llm_review))
-    except Exception as e:
-        return error('Invalid JSON returned from LLM', code='llm_invalid_json', detail=str(e), status=500)
 
-    # Append new review
-    sec_rev = project_data.get('securityrev', [])
-    sec_rev.append({
-        "review": llm_review_obj
-    })
-    ref.update({
-        "securityrev": sec_rev
-    })  
+    llm_review = handle_llm_review("security", user_id, project_id, data)
 
-    return success({
+    return finalize_review(llm_review, user_id, ref, 'securityrev', {
         "review_type": "security",
         "user_id": user_id,
-        "project_id": project_id,
-        "response": llm_review_obj
+        "project_id": project_id
     })
 
 
+# ===== Background Jobs =====
+# Job status lives in Firebase so any worker process can answer a poll
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='jobs')
+
+def start_job(user_id, node, fn, *args, progress=False):
+    """
+    Run fn(*args) on the job pool, tracking it at users/{user_id}/{node}/{job_id}.
+    The stored record moves from queued to running to done (with result) or failed (with error).
+    With progress=True, fn also gets a progress(data) callback that stores data on the running job.
+    """
+    job_id = new_id()
+    job_ref = db.reference(f'users/{user_id}/{node}/{job_id}')
+    job_ref.set({'job_id': job_id, 'status': 'queued', 'created_at': get_timestamp()})
+
+    def run():
+        job_ref.update({'status': 'running', 'started_at': get_timestamp()})
+        kwargs = {'progress': lambda data: job_ref.update({'progress': data})} if progress else {}
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.exception("Job %s/%s failed", node, job_id)
+            job_ref.update({
+                'status': 'failed',
+                'error': {'code': getattr(e, 'code', 'job_failed'), 'message': str(e)},
+                'finished_at': get_timestamp()
+            })
+        else:
+            job_ref.update({'status': 'done', 'result': result, 'finished_at': get_timestamp()})
+
+    JOB_EXECUTOR.submit(run)
+    return job_id
+
+
 # ===== GitHub Integration =====
 def extract_github_token():
     auth_header = request.headers.get('Authorization', '')
@@ -1326,6 +1725,12 @@ def extract_github_token():
         token = json_data.get('access_token')
     return token
 
+# Shared session so GitHub calls reuse TCP/TLS connections; pool sized for concurrent blob fetches
+GH_SESSION = requests.Session()
+GH_SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+
+# Built per call: caching would keep raw user tokens in memory and share one
+# mutable dict between requests
 def github_headers(token):
     return {
         'Authorization': f'Bearer {token}',
@@ -1333,6 +1738,131 @@ def github_headers(token):
         'X-GitHub-Api-Version': '2022-11-28'
     }
 
+# Last seen rate-limit state per Authorization header: key -> (remaining, reset_epoch)
+GITHUB_RATE_LOW_WATER = 10
+GITHUB_MAX_THROTTLE_SECONDS = 60
+_github_rate = TTLCache(maxsize=1024, ttl=3600)
+_github_rate_lock = threading.Lock()
+
+def github_rate_key(headers):
+    return hashlib.sha256((headers or {}).get('Authorization', '').encode('utf-8')).hexdigest()
+
+def github_rate_remaining(headers):
+    """Remaining requests for these credentials, or None if not seen yet"""
+    with _github_rate_lock:
+        state = _github_rate.get(github_rate_key(headers))
+    return state[0] if state else None
+
+class GitHubRateLimited(Exception):
+    """GitHub quota for these credentials is nearly spent; retry after retry_after seconds"""
+    def __init__(self, retry_after):
+        super().__init__('GitHub rate limit nearly exhausted, try again later')
+        self.retry_after = retry_after
+
+@app.errorhandler(GitHubRateLimited)
+def github_rate_limited(e):
+    resp, status = error(str(e), code='github_rate_limited', status=429)
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp, status
+
+def github_get(url, headers=None, throttle=False, **kwargs):
+    """
+    GET a GitHub API URL on the shared session. When the last response for
+    these credentials was nearly out of quota, background jobs (throttle=True)
+    wait for the reset first (capped) instead of running into 403s; request
+    paths raise GitHubRateLimited (a 429) rather than parking the worker.
+    """
+    key = github_rate_key(headers)
+    with _github_rate_lock:
+        state = _github_rate.get(key)
+    if state and state[0] < GITHUB_RATE_LOW_WATER:
+        wait = state[1] - time.time() + 1
+        if wait > 0:
+            if not throttle:
+                raise GitHubRateLimited(int(wait))
+            logger.warning("GitHub rate limit nearly exhausted, waiting %.0fs", min(wait, GITHUB_MAX_THROTTLE_SECONDS))
+            time.sleep(min(wait, GITHUB_MAX_THROTTLE_SECONDS))
+
+    resp = GH_SESSION.get(url, headers=headers, **kwargs)
+    remaining = resp.headers.get('X-RateLimit-Remaining')
+    reset = resp.headers.get('X-RateLimit-Reset')
+    if remaining is not None and reset is not None:
+        try:
+            with _github_rate_lock:
+                _github_rate[key] = (int(remaining), int(reset))
+        except ValueError:
+            pass
+    return resp
+
+# ETag cache for conditional GitHub API requests: key -> (etag, data).
+# 304 responses do not count against the GitHub rate limit.
+GITHUB_ETAG_CACHE_SIZE = 1024
+_github_etag_cache = OrderedDict()
+_github_etag_lock = threading.Lock()
+
+def github_cache_key(token, *parts):
+    """Build a cache key that never contains the raw token"""
+    return (hashlib.sha256(token.encode('utf-8')).hexdigest(),) + parts
+
+def github_etag_get(key):
+    with _github_etag_lock:
+        entry = _github_etag_cache.get(key)
+        if entry is not None:
+            _github_etag_cache.move_to_end(key)
+        return entry
+
+def github_etag_put(key, etag, data):
+    if not etag:
+        return
+    with _github_etag_lock:
+        _github_etag_cache[key] = (etag, data)
+        _github_etag_cache.move_to_end(key)
+        while len(_github_etag_cache) > GITHUB_ETAG_CACHE_SIZE:
+            _github_etag_cache.popitem(last=False)
+
+# Repo metadata lookups, cached for 5 minutes per (token, repo)
+_repo_meta_cache = TTLCache(maxsize=1024, ttl=300)
+_repo_meta_lock = threading.Lock()
+
+def resolve_repo_meta(repo_full_name, token, throttle=False):
+    """
+    Return {'default_branch', 'size', 'etag'} for a repo, or None if the repo
+    can't be read with this token.
+    """
+    key = github_cache_key(token, 'repos', repo_full_name)
+    with _repo_meta_lock:
+        meta = _repo_meta_cache.get(key)
+    if meta:
+        return meta
+
+    # Revalidate with the stored ETag so an expired entry costs no rate limit when unchanged
+    cached = github_etag_get(key)
+    headers = github_headers(token)
+    if cached:
+        headers = {**headers, 'If-None-Match': cached[0]}
+    repo_resp = github_get(
+        f'https://api.github.com/repos/{repo_full_name}',
+        headers=headers,
+        throttle=throttle,
+        timeout=15
+    )
+    if repo_resp.status_code == 304 and cached:
+        meta = cached[1]
+    elif repo_resp.status_code == 200:
+        repo = loads_json(repo_resp.content) or {}
+        meta = {
+            'default_branch': repo.get('default_branch') or 'main',
+            'size': repo.get('size'),
+            'etag': repo_resp.headers.get('ETag')
+        }
+        github_etag_put(key, meta['etag'], meta)
+    else:
+        return None
+
+    with _repo_meta_lock:
+        _repo_meta_cache[key] = meta
+    return meta
+
 @app.route('/auth/github/exchange-token', methods=['POST'])
 def github_exchange_token():
     data = request.get_json(silent=True) or {}
@@ -1343,7 +1873,7 @@ def github_exchange_token():
     if not GITHUB_CLIENT_ID or not GITHUB_CLIENT_SECRET:
         return error('Server missing GitHub OAuth configuration', code='server_misconfig', status=500)
     try:
-        resp = requests.post(
+        resp = GH_SESSION.post(
             'https://github.com/login/oauth/access_token',
             headers={'Accept': 'application/json'},
             data={
@@ -1355,7 +1885,7 @@ def github_exchange_token():
             timeout=15
         )
         resp.raise_for_status()
-        payload = resp.json()
+        payload = loads_json(resp.content)
         if 'error' in payload:
             return error(payload.get('error_description') or payload.get('error'), code='oauth_error', status=400)
         return success({
@@ -1373,17 +1903,24 @@ def list_github_repos(user_id):
         return error('Missing GitHub access token', code='unauthorized', status=401)
     per_page = request.args.get('per_page', default=100, type=int)
     page = request.args.get('page', default=1, type=int)
+    cache_key = github_cache_key(token, 'user/repos', per_page, page)
+    cached = github_etag_get(cache_key)
+    headers = github_headers(token)
+    if cached:
+        headers = {**headers, 'If-None-Match': cached[0]}
     try:
-        resp = requests.get(
+        resp = github_get(
             f'https://api.github.com/user/repos',
-            headers=github_headers(token),
+            headers=headers,
             params={'per_page': per_page, 'page': page, 'sort': 'updated'},
             timeout=15
         )
+        if resp.status_code == 304 and cached:
+            return success(cached[1])
         if resp.status_code == 401:
             return error('Invalid GitHub token', code='unauthorized', status=401)
         resp.raise_for_status()
-        repos = resp.json()
+        repos = loads_json(resp.content)
         simplified = []
         for r in repos:
             simplified.append({
@@ -1400,7 +1937,10 @@ def list_github_repos(user_id):
                     'login': (r.get('owner') or {}).get('login')
                 }
             })
+        github_etag_put(cache_key, resp.headers.get('ETag'), simplified)
         return success(simplified)
+    except GitHubRateLimited:
+        raise
     except Exception as e:
         return error(str(e), code='github_list_failed', status=502)
 
@@ -1439,6 +1979,28 @@ def normalize_relative_path(path: str) -> str:
         raise ValueError("Invalid path")
     return norm.replace(os.sep, '/')
 
+def read_upload_text(storage, max_bytes=None, chunk_size=64 * 1024):
+    """
+    Read an uploaded file as UTF-8 text in fixed-size chunks.
+    Returns None as soon as the file is known to exceed max_bytes.
+    """
+    limit = max_bytes if isinstance(max_bytes, int) and max_bytes > 0 else None
+    if limit and storage.content_length and storage.content_length > limit:
+        return None
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parts = []
+    total = 0
+    while True:
+        chunk = storage.stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if limit and total > limit:
+            return None
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
 @app.route('/users/<user_id>/projects/<project_id>/submissions/batch', methods=['POST'])
 def create_submissions_batch(user_id, project_id):
     """
@@ -1459,8 +2021,9 @@ def create_submissions_batch(user_id, project_id):
         return error('Project not found', code='not_found', status=404)
 
     created = 0
-    created_ids = []
-    fileids = project.get('fileids', [])
+    # All files in one batch share a single timestamp and size-bounded multi-path updates
+    ts = get_timestamp()
+    batches = SubmissionBatches(user_id, project_id, project, ts)
 
     for f in files:
         raw_path = (f or {}).get('path') or (f or {}).get('filename')
@@ -1481,7 +2044,7 @@ def create_submissions_batch(user_id, project_id):
         if isinstance(max_bytes, int) and max_bytes > 0 and size_bytes > max_bytes:
             continue
 
-        submission_id = str(uuid.uuid4())
+        submission_id = new_id()
         submission_data = {
             'id': submission_id,
             'projectid': project_id,
@@ -1489,19 +2052,17 @@ def create_submissions_batch(user_id, project_id):
             'code': content or '',
             'logicrev': [],
             'testcases': [],
-            'created_at': get_timestamp(),
-            'updated_at': get_timestamp()
+            'created_at': ts,
+            'updated_at': ts
         }
-        get_submission_ref(user_id, submission_id).set(submission_data)
-        fileids.append(submission_id)
-        created_ids.append(submission_id)
+        batches.add(submission_data)
         created += 1
 
         if isinstance(max_files, int) and max_files > 0 and created >= max_files:
             break
 
-    project_ref.update({'fileids': fileids, 'updated_at': get_timestamp()})
-    return success({'created': created, 'created_ids': created_ids}, meta={'message': 'Batch upload complete'}, status=201)
+    batches.flush()
+    return success({'created': created, 'created_ids': batches.created_ids}, meta={'message': 'Batch upload complete'}, status=201)
 
 @app.route('/users/<user_id>/projects/<project_id>/submissions/upload', methods=['POST'])
 def upload_submissions_multipart(user_id, project_id):
@@ -1521,7 +2082,7 @@ def upload_submissions_multipart(user_id, project_id):
     storage_files = request.files.getlist('files')
     rel_paths_raw = request.form.get('relative_paths', '')
     try:
-        rel_paths = json.loads(rel_paths_raw) if rel_paths_raw else []
+        rel_paths = loads_json(rel_paths_raw) if rel_paths_raw else []
         if not isinstance(rel_paths, list):
             rel_paths = []
     except Exception:
@@ -1531,8 +2092,9 @@ def upload_submissions_multipart(user_id, project_id):
     max_bytes = request.form.get('max_bytes', type=int)
 
     created = 0
-    created_ids = []
-    fileids = project.get('fileids', [])
+    # All files in one upload share a single timestamp and size-bounded multi-path updates
+    ts = get_timestamp()
+    batches = SubmissionBatches(user_id, project_id, project, ts)
 
     for idx, storage in enumerate(storage_files):
         if not storage:
@@ -1543,15 +2105,14 @@ def upload_submissions_multipart(user_id, project_id):
         except ValueError:
             continue
 
-        data_bytes = storage.read() or b''
-        if isinstance(max_bytes, int) and max_bytes > 0 and len(data_bytes) > max_bytes:
-            continue
         try:
-            code_str = data_bytes.decode('utf-8', errors='replace')
+            code_str = read_upload_text(storage, max_bytes)
         except Exception:
             code_str = ''
+        if code_str is None:
+            continue
 
-        submission_id = str(uuid.uuid4())
+        submission_id = new_id()
         submission_data = {
             'id': submission_id,
             'projectid': project_id,
@@ -1559,19 +2120,17 @@ def upload_submissions_multipart(user_id, project_id):
             'code': code_str,
             'logicrev': [],
             'testcases': [],
-            'created_at': get_timestamp(),
-            'updated_at': get_timestamp()
+            'created_at': ts,
+            'updated_at': ts
         }
-        get_submission_ref(user_id, submission_id).set(submission_data)
-        fileids.append(submission_id)
-        created_ids.append(submission_id)
+        batches.add(submission_data)
         created += 1
 
         if isinstance(max_files, int) and max_files > 0 and created >= max_files:
             break
 
-    project_ref.update({'fileids': fileids, 'updated_at': get_timestamp()})
-    return success({'created': created, 'created_ids': created_ids}, meta={'message': 'Upload complete'}, status=201)
+    batches.flush()
+    return success({'created': created, 'created_ids': batches.created_ids}, meta={'message': 'Upload complete'}, status=201)
 
 @app.route('/users/<user_id>/projects/<project_id>/github/link', methods=['POST'])
 def link_github_repo(user_id, project_id):
@@ -1591,7 +2150,7 @@ def link_github_repo(user_id, project_id):
     default_branch = None
     if token:
         try:
-            check = requests.get(
+            check = github_get(
                 f'https://api.github.com/repos/{repo_full_name}',
                 headers=github_headers(token),
                 timeout=15
@@ -1601,7 +2160,9 @@ def link_github_repo(user_id, project_id):
             if check.status_code == 401:
                 return error('Invalid GitHub token', code='unauthorized', status=401)
             check.raise_for_status()
-            default_branch = (check.json() or {}).get('default_branch')
+            default_branch = (loads_json(check.content) or {}).get('default_branch')
+        except GitHubRateLimited:
+            raise
         except Exception as e:
             return error(f'Failed to verify repo: {str(e)}', code='github_repo_verify_failed', status=502)
 
@@ -1616,15 +2177,264 @@ def link_github_repo(user_id, project_id):
     project_ref.update({'github': github_link, 'updated_at': get_timestamp()})
     return success({'github': github_link}, meta={'message': 'Repository linked'})
 
+# Concurrent blob downloads per import; bounded to stay well under GitHub's secondary rate limits
+GITHUB_BLOB_WORKERS = 16
+TARBALL_BUFFER_SIZE = 1024 * 1024
+# Tar members read ahead of the consumer
+TARBALL_QUEUE_SIZE = 64
+# Above this many blobs a single tarball download beats one request per file
+TARBALL_THRESHOLD = 50
+# Hard ceiling per imported file, applied even when the request sets no max_bytes
+IMPORT_MAX_FILE_BYTES = 10 * 1024 * 1024
+
+def make_submission(project_id, path, code_str, ts):
+    """Build the submission record for an imported file"""
+    return {
+        'id': new_id(),
+        'projectid': project_id,
+        'filename': path,
+        'code': code_str,
+        'logicrev': [],
+        'testcases': [],
+        'created_at': ts,
+        'updated_at': ts
+    }
+
+def iter_tarball_files(repo_full_name, branch, headers, max_bytes=None, throttle=False):
+    """
+    Stream the repo tarball and yield (path, code_str) for each regular file.
+    A producer thread reads and decompresses the tarball while the caller
+    decodes and builds submissions.
+    """
+    tar_url = f'https://api.github.com/repos/{repo_full_name}/tarball/{branch}'
+    tar_resp = github_get(tar_url, headers=headers, throttle=throttle, stream=True, timeout=60)
+    tar_resp.raise_for_status()
+    tar_resp.raw.decode_content = True
+
+    members = queue.Queue(maxsize=TARBALL_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up once the consumer is gone so the producer never blocks forever
+        while not stop.is_set():
+            try:
+                members.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            # Read the socket in large chunks rather than tarfile's small block reads
+            raw = io.BufferedReader(tar_resp.raw, buffer_size=TARBALL_BUFFER_SIZE)
+            with tarfile.open(fileobj=raw, mode='r|*') as tar:
+                for member in tar:
+                    if not member.isreg():
+                        continue
+                    # Check the header size before reading the body into memory
+                    if member.size > IMPORT_MAX_FILE_BYTES or (max_bytes and member.size > max_bytes):
+                        continue
+                    # member.name includes a top-level folder; strip it
+                    parts = member.name.split('/', 1)
+                    path = parts[1] if len(parts) > 1 else parts[0]
+                    fileobj = tar.extractfile(member)
+                    if not fileobj:
+                        continue
+                    if not put((path, fileobj.read())):
+                        return
+            put(None)
+        except Exception as e:
+            put(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = members.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            path, content_bytes = item
+            yield path, content_bytes.decode('utf-8', errors='replace')
+    finally:
+        stop.set()
+        tar_resp.close()
+
+def fetch_blob(repo_full_name, node, raw_headers, throttle=False):
+    """
+    Download one tree blob. raw_headers must request the raw media type.
+    Returns (path, code_str) or None if it can't be fetched.
+    """
+    path = node.get('path') or ''
+    blob_sha = node.get('sha')
+    logger.debug("[IMPORT] Fetching blob for %s (sha: %s)", path, blob_sha)
+    # Stream the body so only one copy of the file is held before decoding
+    with github_get(
+        f'https://api.github.com/repos/{repo_full_name}/git/blobs/{blob_sha}',
+        headers=raw_headers,
+        throttle=throttle,
+        stream=True,
+        timeout=20
+    ) as blob_resp:
+        if blob_resp.status_code != 200:
+            logger.warning("[IMPORT] Failed to get blob for %s, status: %s", path, blob_resp.status_code)
+            return None
+        content = bytearray()
+        for chunk in blob_resp.iter_content(chunk_size=64 * 1024):
+            content.extend(chunk)
+    code_str = content.decode('utf-8', errors='replace')
+    logger.debug("[IMPORT] Got raw content for %s (%d chars)", path, len(code_str))
+    return path, code_str
+
+class GitHubImportError(Exception):
+    """Import failure carrying the API error code and HTTP status to report"""
+    def __init__(self, message, code='github_import_failed', status=502):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+def run_github_import(user_id, project_id, token, repo_full_name, branch=None, max_files=None, max_bytes=None, throttle=True, progress=None):
+    """
+    Import repo files as submissions of the project and return the import summary.
+    Raises GitHubImportError for expected failures (missing project, branch or bad token).
+    throttle=False (synchronous imports) raises GitHubRateLimited instead of waiting out a low quota.
+    progress, when given, is called with {"files_imported": n} after each written batch.
+    """
+    project = get_project_ref(user_id, project_id).get()
+    if not project:
+        raise GitHubImportError('Project not found', code='not_found', status=404)
+    meta = None
+    if not branch:
+        meta = resolve_repo_meta(repo_full_name, token, throttle)
+        branch = (meta or {}).get('default_branch') or 'main'
+
+    # Build request headers once for every call below
+    headers = github_headers(token)
+    # Raw media type returns blob bytes directly: no JSON wrapper, no base64
+    raw_headers = {**headers, 'Accept': 'application/vnd.github.raw'}
+
+    tree_url = f'https://api.github.com/repos/{repo_full_name}/git/trees/{branch}'
+    logger.debug("[IMPORT] Fetching tree from: %s", tree_url)
+    tree_resp = github_get(
+        tree_url,
+        headers=headers,
+        params={'recursive': '1'},
+        throttle=throttle,
+        timeout=20
+    )
+    logger.debug("[IMPORT] Tree API response status: %s", tree_resp.status_code)
+    if tree_resp.status_code == 404:
+        # Fallback to the repo default branch if provided branch not found
+        meta = meta or resolve_repo_meta(repo_full_name, token, throttle)
+        default_branch = (meta or {}).get('default_branch')
+        if default_branch and default_branch != branch:
+            tree_resp = github_get(
+                f'https://api.github.com/repos/{repo_full_name}/git/trees/{default_branch}',
+                headers=headers,
+                params={'recursive': '1'},
+                throttle=throttle,
+                timeout=20
+            )
+            branch = default_branch
+        else:
+            raise GitHubImportError('Repository or branch not found', code='not_found', status=404)
+    if tree_resp.status_code == 401:
+        raise GitHubImportError('Invalid GitHub token', code='unauthorized', status=401)
+    tree_resp.raise_for_status()
+    tree_payload = loads_json(tree_resp.content)
+    tree = tree_payload.get('tree', [])
+    truncated = bool(tree_payload.get('truncated'))
+    logger.info("[IMPORT] Got %d items from tree API, truncated=%s", len(tree), truncated)
+
+    ts = get_timestamp()
+    created = 0
+
+    def flushed(written):
+        # Each batch is readable right away, even if a later one fails
+        invalidate_user_cache(user_id)
+        if progress:
+            progress({'files_imported': written})
+
+    batches = SubmissionBatches(user_id, project_id, project, ts, on_flush=flushed)
+    imported_paths = set()
+    blob_nodes = []
+    for node in tree:
+        if node.get('type') != 'blob':
+            logger.debug("[IMPORT] Skipping non-blob: %s (type: %s)", node.get('path'), node.get('type'))
+            continue
+        path = node.get('path') or ''
+        size = node.get('size') or 0
+        logger.debug("[IMPORT] Processing file: %s (size=%s)", path, size)
+        if size > IMPORT_MAX_FILE_BYTES or (max_bytes and size and size > max_bytes):
+            logger.debug("[IMPORT] Skipping %s - too large (%s bytes)", path, size)
+            continue
+        # Import all files regardless of extension
+        blob_nodes.append(node)
+
+    # Large or truncated trees: one tarball download instead of a request per blob
+    tarball_used = truncated or len(blob_nodes) > TARBALL_THRESHOLD
+    if tarball_used:
+        try:
+            for path, code_str in iter_tarball_files(repo_full_name, branch, headers, max_bytes, throttle):
+                if path in imported_paths:
+                    continue
+                submission_data = make_submission(project_id, path, code_str, ts)
+                batches.add(submission_data)
+                imported_paths.add(path)
+                created += 1
+                if max_files and created >= max_files:
+                    break
+        except GitHubRateLimited:
+            raise
+        except Exception as e:
+            # Fall back to per-blob fetches for whatever the tarball didn't cover
+            logger.warning("[IMPORT] Tarball import failed, fetching blobs instead: %s", e)
+            tarball_used = False
+
+    if not tarball_used and not (max_files and created >= max_files):
+        # Fetch blobs concurrently; Firebase writes stay on this thread
+        # Back off to a couple of workers when the token is running low on quota
+        remaining = github_rate_remaining(headers)
+        workers = GITHUB_BLOB_WORKERS if remaining is None or remaining >= 100 else 2
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch_blob, repo_full_name, node, raw_headers, throttle)
+                       for node in blob_nodes if node.get('path') not in imported_paths]
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                path, code_str = result
+
+                submission_data = make_submission(project_id, path, code_str, ts)
+                batches.add(submission_data)
+                imported_paths.add(path)
+                created += 1
+                logger.debug("[IMPORT] Created submission %s for %s", submission_data['id'], path)
+
+                if max_files and created >= max_files:
+                    logger.info("[IMPORT] Hit max_files limit (%s), stopping", max_files)
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+    batches.flush()
+    logger.info("[IMPORT] Import complete: %d files imported for project %s", created, project_id)
+    return {'files_imported': created, 'truncated_fallback_used': truncated, 'tarball_used': tarball_used}
+
+
 @app.route('/users/<user_id>/projects/<project_id>/github/import', methods=['POST'])
 def import_github_repo(user_id, project_id):
-    print(f"[IMPORT] Starting import for user={user_id}, project={project_id}")
+    """
+    Start a background import of a GitHub repo into the project and return 202
+    with a job_id to poll at /users/<user_id>/imports/<job_id>.
+    Pass "wait": true to import synchronously and get the summary directly.
+    """
+    logger.info("[IMPORT] Starting import for user=%s, project=%s", user_id, project_id)
     token = extract_github_token()
     if not token:
-        print("[IMPORT] No GitHub token found")
+        logger.info("[IMPORT] No GitHub token found")
         return error('Missing GitHub access token', code='unauthorized', status=401)
-    
-    print(f"[IMPORT] Using GitHub token: {token[:10]}..." if token else "[IMPORT] No token")
 
     data = request.get_json(silent=True) or {}
     repo_full_name = data.get('repo_full_name')
@@ -1638,183 +2448,46 @@ def import_github_repo(user_id, project_id):
     if not project:
         return error('Project not found', code='not_found', status=404)
 
+    linked = project.get('github') or {}
     if not repo_full_name:
-        linked = project.get('github') or {}
         repo_full_name = linked.get('repo_full_name')
     if not repo_full_name:
         return error('repo_full_name is required (or link the project first)', code='validation_error', status=400)
-
     if not branch:
-        # Prefer linked branch if available, else repo default
-        linked = project.get('github') or {}
+        # Prefer linked branch if available, else the repo default (resolved in the import)
         branch = linked.get('branch')
-        if not branch:
-            repo_resp = requests.get(
-                f'https://api.github.com/repos/{repo_full_name}',
-                headers=github_headers(token),
-                timeout=15
-            )
-            if repo_resp.status_code == 200:
-                branch = (repo_resp.json() or {}).get('default_branch') or 'main'
-            else:
-                branch = 'main'
 
-    if not repo_full_name:
-        return error('repo_full_name is required (or link the project first)', code='validation_error', status=400)
-
-    try:
-        tree_url = f'https://api.github.com/repos/{repo_full_name}/git/trees/{branch}'
-        print(f"[IMPORT] Fetching tree from: {tree_url}")
-        tree_resp = requests.get(
-            tree_url,
-            headers=github_headers(token),
-            params={'recursive': '1'},
-            timeout=20
-        )
-        print(f"[IMPORT] Tree API response status: {tree_resp.status_code}")
-        if tree_resp.status_code == 404:
-            # Fallback to the repo default branch if provided branch not found
-            repo_resp = requests.get(
-                f'https://api.github.com/repos/{repo_full_name}',
-                headers=github_headers(token),
-                timeout=15
-            )
-            if repo_resp.status_code == 200:
-                default_branch = (repo_resp.json() or {}).get('default_branch') or 'main'
-                tree_resp = requests.get(
-                    f'https://api.github.com/repos/{repo_full_name}/git/trees/{default_branch}',
-                    headers=github_headers(token),
-                    params={'recursive': '1'},
-                    timeout=20
-                )
-                branch = default_branch
-            else:
-                return error('Repository or branch not found', code='not_found', status=404)
-        if tree_resp.status_code == 401:
-            return error('Invalid GitHub token', code='unauthorized', status=401)
-        tree_resp.raise_for_status()
-        tree_payload = tree_resp.json()
-        tree = tree_payload.get('tree', [])
-        truncated = bool(tree_payload.get('truncated'))
-        print(f"[IMPORT] Got {len(tree)} items from tree API, truncated={truncated}")
-
-        created = 0
-        fileids = project.get('fileids', [])
-        for node in tree:
-            if node.get('type') != 'blob':
-                print(f"[IMPORT] Skipping non-blob: {node.get('path')} (type: {node.get('type')})")
-                continue
-            path = node.get('path') or ''
-            size = node.get('size') or 0
-            print(f"[IMPORT] Processing file: {path} (size={size})")
-            if max_bytes and size and size > max_bytes:
-                print(f"[IMPORT] Skipping {path} - too large ({size} bytes)")
-                continue
-            # Import all files regardless of extension
-
-            blob_sha = node.get('sha')
-            print(f"[IMPORT] Fetching blob for {path} (sha: {blob_sha})")
-            blob_resp = requests.get(
-                f'https://api.github.com/repos/{repo_full_name}/git/blobs/{blob_sha}',
-                headers=github_headers(token),
-                timeout=20
-            )
-            # GitHub might return truncated content via the content API; ensure full blob fetch
-            if blob_resp.status_code != 200:
-                print(f"[IMPORT] Failed to get blob for {path}, status: {blob_resp.status_code}")
-                continue
-            blob = blob_resp.json()
-            if blob.get('encoding') == 'base64':
-                try:
-                    # GitHub returns base64 content with newlines that need to be removed
-                    content_b64 = (blob.get('content') or '').replace('\n', '').replace('\r', '')
-                    content_bytes = base64.b64decode(content_b64, validate=True)
-                    code_str = content_bytes.decode('utf-8', errors='replace')
-                    print(f"[IMPORT] Decoded base64 content for {path} ({len(code_str)} chars)")
-                except Exception as e:
-                    print(f"[IMPORT] Failed to decode base64 for {path}: {str(e)}")
-                    continue
-            else:
-                # Some endpoints may return raw content; try to treat it as text
-                code_str = str(blob.get('content', ''))
-                print(f"[IMPORT] Got raw content for {path} ({len(code_str)} chars)")
-
-            submission_id = str(uuid.uuid4())
-            submission_data = {
-                'id': submission_id,
-                'projectid': project_id,
-                'filename': path,
-                'code': code_str,
-                'logicrev': [],
-                'testcases': [],
-                'created_at': get_timestamp(),
-                'updated_at': get_timestamp()
-            }
-            get_submission_ref(user_id, submission_id).set(submission_data)
-            fileids.append(submission_id)
-            created += 1
-            print(f"[IMPORT] Created submission {submission_id} for {path}")
-
-            if max_files and created >= max_files:
-                print(f"[IMPORT] Hit max_files limit ({max_files}), stopping")
-                break
-        # If Git tree was truncated, fall back to tarball to capture remaining files
-        if truncated:
-            try:
-                tar_url = f'https://api.github.com/repos/{repo_full_name}/tarball/{branch}'
-                tar_resp = requests.get(tar_url, headers=github_headers(token), stream=True, timeout=60)
-                if tar_resp.status_code == 200:
-                    tar_resp.raw.decode_content = True
-                    with tarfile.open(fileobj=tar_resp.raw, mode='r|*') as tar:
-                        for member in tar:
-                            if not member.isreg():
-                                continue
-                            # member.name includes a top-level folder; strip it
-                            parts = member.name.split('/', 1)
-                            path = parts[1] if len(parts) > 1 else parts[0]
-                            # Skip if already imported from the tree API loop
-                            if any(sid for sid in fileids if path == db.reference(f'users/{user_id}/submissions/{sid}').get().get('filename')):
-                                continue
-                            fileobj = tar.extractfile(member)
-                            if not fileobj:
-                                continue
-                            try:
-                                content_bytes = fileobj.read()
-                                code_str = content_bytes.decode('utf-8', errors='replace')
-                            except Exception:
-                                continue
-                            submission_id = str(uuid.uuid4())
-                            submission_data = {
-                                'id': submission_id,
-                                'projectid': project_id,
-                                'filename': path,
-                                'code': code_str,
-                                'logicrev': [],
-                                'testcases': [],
-                                'created_at': get_timestamp(),
-                                'updated_at': get_timestamp()
-                            }
-                            get_submission_ref(user_id, submission_id).set(submission_data)
-                            fileids.append(submission_id)
-                            created += 1
-                            if max_files and created >= max_files:
-                                break
-                else:
-                    # If tar fallback fails, proceed with what we have
-                    pass
-            except Exception:
-                # Ignore tar fallback errors; return what we imported
-                pass
-
-        project_ref.update({'fileids': fileids, 'updated_at': get_timestamp()})
-        print(f"[IMPORT] Import complete: {created} files imported, updating project fileids")
-        return success(
-            {'files_imported': created, 'truncated_fallback_used': truncated},
-            meta={'message': 'Import complete'},
-            status=201
-        )
-    except Exception as e:
-        return error(str(e), code='github_import_failed', status=502)
+    args = (user_id, project_id, token, repo_full_name, branch, max_files, max_bytes)
+    if data.get('wait'):
+        try:
+            result = run_github_import(*args, throttle=False)
+        except GitHubRateLimited:
+            raise
+        except GitHubImportError as e:
+            return error(str(e), code=e.code, status=e.status)
+        except Exception as e:
+            return error(str(e), code='github_import_failed', status=502)
+        return success(result, meta={'message': 'Import complete'}, status=201)
+
+    job_id = start_job(user_id, 'imports', run_github_import, *args, progress=True)
+    return success({'job_id': job_id, 'status': 'queued'}, meta={'message': 'Import started'}, status=202)
+
+@app.route('/users/<user_id>/reviews/<job_id>', methods=['GET'])
+def get_review_job(user_id, job_id):
+    """Get the status of a background review (see ?async=true on the review endpoints)"""
+    job = db.reference(f'users/{user_id}/reviews/{job_id}').get()
+    if not job:
+        return error('Review job not found', code='not_found', status=404)
+    return success(job)
+
+@app.route('/users/<user_id>/imports/<job_id>', methods=['GET'])
+def get_import_job(user_id, job_id):
+    """Get the status of a background repo import"""
+    job = db.reference(f'users/{user_id}/imports/{job_id}').get()
+    if not job:
+        return error('Import job not found', code='not_found', status=404)
+    return success(job)
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     app.run(debug=True)
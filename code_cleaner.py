@@ -1,38 +1,47 @@
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+_DOCSTRING_RE = re.compile(r'(""".*?"""|\'\'\'.*?\'\'\')', flags=re.DOTALL)
+_COMMENT_RE = re.compile(r'#.*')
+
+def _keep_line(line: str) -> bool:
+    """False for blank lines and import lines"""
+    stripped = line.lstrip()
+    if not stripped:
+        return False
+    if stripped.startswith('import '):
+        return False
+    return not (stripped.startswith('from ') and ' import ' in stripped[5:])
+
 def compress_code(code: str) -> str:
-    # Remove triple-quoted strings (docstrings)
-    code = re.sub(r'(""".*?"""|\'\'\'.*?\'\'\')', '', code, flags=re.DOTALL)
-    # Remove single-line comments
-    code = re.sub(r'#.*', '', code)
-    # Remove imports
-    code = re.sub(r'^\s*import .*$', '', code, flags=re.MULTILINE)
-    code = re.sub(r'^\s*from .* import .*$', '', code, flags=re.MULTILINE)
-    # Remove blank lines
-    code = "\n".join(line for line in code.splitlines() if line.strip())
-    # Collapse into one line
-    code = "".join(code.splitlines())
-    # Remove ALL spaces
-    code = code.replace(" ", "")
-    return code
+    # Remove triple-quoted strings (docstrings), then single-line comments
+    code = _DOCSTRING_RE.sub('', code)
+    code = _COMMENT_RE.sub('', code)
+    # Drop blank and import lines, collapse into one line and remove ALL spaces
+    return "".join(filter(_keep_line, code.splitlines())).replace(" ", "")
 
-def compress_folder(input_folder: Path, output_folder: Path):
-    for py_file in input_folder.rglob("*.py"):  # Recursively find all .py files
-        rel_path = py_file.relative_to(input_folder)
-        out_file = output_folder / rel_path
-        out_file.parent.mkdir(parents=True, exist_ok=True)
+def _compress_file(paths):
+    py_file, out_file = paths
+    out_file.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(py_file, "r", encoding="utf-8") as f:
-            code = f.read()
+    with open(py_file, "r", encoding="utf-8") as f:
+        code = f.read()
 
-        compressed = compress_code(code)
+    compressed = compress_code(code)
 
-        with open(out_file, "w", encoding="utf-8") as f:
-            f.write(compressed)
+    with open(out_file, "w", encoding="utf-8") as f:
+        f.write(compressed)
+    return py_file, out_file
 
-        print(f"Compressed {py_file} -> {out_file}")
+def compress_folder(input_folder: Path, output_folder: Path):
+    # Recursively find all .py files up front, then compress them on all cores
+    jobs = [(py_file, output_folder / py_file.relative_to(input_folder))
+            for py_file in input_folder.rglob("*.py")]
+    with ProcessPoolExecutor() as pool:
+        for py_file, out_file in pool.map(_compress_file, jobs, chunksize=16):
+            print(f"Compressed {py_file} -> {out_file}")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
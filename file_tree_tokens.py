@@ -1,21 +1,35 @@
 import json
 import math
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 DEFAULT_CHARS_PER_TOKEN = 4
 
+# Files in a directory are read concurrently; reads release the GIL, so threads overlap the I/O
+_FILE_INFO_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix='file-tree')
+
 def estimate_tokens_from_text(text: str, chars_per_token: int = DEFAULT_CHARS_PER_TOKEN) -> int:
     if not text:
         return 0
     return math.ceil(len(text) / chars_per_token)
 
+# UTF-8 continuation bytes (0b10xxxxxx); every other byte starts a character
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+_READ_CHUNK_SIZE = 64 * 1024
+
 def file_info(path: Path, chars_per_token: int = DEFAULT_CHARS_PER_TOKEN) -> dict:
+    # Count bytes, characters and newlines chunk by chunk instead of decoding the whole file
+    size = chars = newlines = 0
+    last = b''
     try:
-        b = path.read_bytes()
-        text = b.decode('utf-8', errors='replace')
-        size = len(b)
-        lines = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
-        tokens = estimate_tokens_from_text(text, chars_per_token)
+        with open(path, 'rb') as f:
+            while chunk := f.read(_READ_CHUNK_SIZE):
+                size += len(chunk)
+                chars += len(chunk.translate(None, _UTF8_CONTINUATION_BYTES))
+                newlines += chunk.count(b'\n')
+                last = chunk[-1:]
+        lines = newlines + (1 if size and last != b'\n' else 0)
+        tokens = math.ceil(chars / chars_per_token) if chars else 0
     except Exception:
         size = 0
         lines = 0
@@ -45,10 +59,11 @@ def build_tree(root: Path, chars_per_token: int = DEFAULT_CHARS_PER_TOKEN) -> di
             entries = sorted(p.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
         except Exception:
             entries = []
+        entries = [e for e in entries if not e.name.startswith('.git')]
+        files = [e for e in entries if e.is_file()]
+        file_infos = dict(zip(files, _FILE_INFO_POOL.map(lambda f: file_info(f, chars_per_token), files)))
         for e in entries:
-            if e.name.startswith('.git'):
-                continue
-            child = _recurse(e)
+            child = file_infos[e] if e in file_infos else _recurse(e)
             node["children"].append(child)
             if child.get("type") == "file":
                 node["totals"]["size_bytes"] += child.get("size_bytes", 0)
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for serving the backend in production:
+    gunicorn -c gunicorn_conf.py app:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Handlers spend most of their time waiting on Firebase, GitHub and the LLM,
+# so threads provide the concurrency. The user-data cache, GitHub ETag cache,
+# rate limits and background job pools live in process memory, so extra
+# workers only see each other's writes once cache entries expire (10s).
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# LLM reviews routinely take longer than gunicorn's 30s default
+timeout = 120
+
+# Each worker imports app.py itself, so Firebase/LLM clients, thread pools and
+# their connections are created after fork and never shared between workers
+preload_app = False
+
+# app.py doesn't configure logging on import. Route its INFO logs (and the
+# memory service's) to gunicorn's error stream. gunicorn merges this dict over
+# its defaults key by key, so its own two loggers are restated here.
+logconfig_dict = {
+    "loggers": {
+        "gunicorn.error": {"level": "INFO", "handlers": ["error_console"], "propagate": False, "qualname": "gunicorn.error"},
+        "gunicorn.access": {"level": "INFO", "handlers": ["console"], "propagate": False, "qualname": "gunicorn.access"},
+        "app": {"level": "INFO", "handlers": ["error_console"], "propagate": False},
+        "services": {"level": "INFO", "handlers": ["error_console"], "propagate": False},
+    }
+}
@@ -0,0 +1,131 @@
+"""
+One-off Firebase data migrations.
+
+Run from the backend folder with FIREBASE_SERVICE_ACCOUNT set:
+    python migrations.py
+"""
+import json
+
+from firebase_admin import db
+
+# Importing the app initializes Firebase from FIREBASE_SERVICE_ACCOUNT
+from app import count_severities
+
+REVIEW_FIELDS = {
+    'projects': ['securityrev'],
+    'submissions': ['securityrev', 'logicrev', 'testingrev'],
+}
+
+
+def decode_review_entries(entries):
+    """
+    Convert string-encoded review entries into ``{"review": {...}}`` objects.
+    Returns (entries, changed). Entries that are not valid JSON are left as-is.
+    """
+    if isinstance(entries, dict):
+        items = list(entries.items())
+    elif isinstance(entries, list):
+        items = list(enumerate(entries))
+    else:
+        return entries, False
+
+    changed = False
+    for key, entry in items:
+        if not isinstance(entry, str):
+            continue
+        try:
+            decoded = json.loads(entry)
+        except ValueError:
+            continue
+        if not isinstance(decoded, dict):
+            continue
+        if 'review' not in decoded:
+            decoded = {'review': decoded}
+        entries[key] = decoded
+        changed = True
+    return entries, changed
+
+
+def migrate_review_strings(user_id):
+    """Decode string-encoded reviews for one user in place. Returns number of records updated."""
+    updated = 0
+    for node, fields in REVIEW_FIELDS.items():
+        records = db.reference(f'users/{user_id}/{node}').get() or {}
+        for record_id, record in records.items():
+            if not isinstance(record, dict):
+                continue
+            updates = {}
+            for field in fields:
+                entries, changed = decode_review_entries(record.get(field))
+                if changed:
+                    updates[field] = entries
+            if updates:
+                db.reference(f'users/{user_id}/{node}/{record_id}').update(updates)
+                updated += 1
+    return updated
+
+
+def backfill_severity_totals(user_id):
+    """
+    Store severity_counts on each security review entry and severity_totals on
+    each submission with security reviews, which the metrics endpoints read.
+    Returns number of submissions updated.
+    """
+    updated = 0
+    submissions = db.reference(f'users/{user_id}/submissions').get() or {}
+    for submission_id, submission in submissions.items():
+        if not isinstance(submission, dict) or not submission.get('securityrev'):
+            continue
+        entries = submission['securityrev']
+        keys = entries.keys() if isinstance(entries, dict) else range(len(entries))
+        updates = {}
+        totals = count_severities(entries)
+        for key in keys:
+            entry = entries[key]
+            counts = count_severities([entry])
+            if isinstance(entry, dict) and entry.get('severity_counts') != counts:
+                updates[f'securityrev/{key}/severity_counts'] = counts
+        if submission.get('severity_totals') != totals:
+            updates['severity_totals'] = totals
+        if updates:
+            db.reference(f'users/{user_id}/submissions/{submission_id}').update(updates)
+            updated += 1
+    return updated
+
+
+def migrate_fileids_to_sets(user_id):
+    """Rewrite array-shaped project fileids as keyed sets {submission_id: true}. Returns number of projects updated."""
+    projects = db.reference(f'users/{user_id}/projects').get() or {}
+    updates = {}
+    for project_id, project in projects.items():
+        if not isinstance(project, dict):
+            continue
+        fileids = project.get('fileids')
+        if not fileids:
+            continue
+        if isinstance(fileids, dict):
+            if all(value is True for value in fileids.values()):
+                continue
+            # Sparse legacy arrays come back as dicts keyed by index
+            ids = [key if value is True else value for key, value in fileids.items() if value]
+        else:
+            ids = [sid for sid in fileids if sid]
+        updates[f'{project_id}/fileids'] = dict.fromkeys(ids, True)
+    if updates:
+        db.reference(f'users/{user_id}/projects').update(updates)
+    return len(updates)
+
+
+def run_all():
+    user_ids = db.reference('users').get(shallow=True) or {}
+    for user_id in user_ids:
+        updated = migrate_review_strings(user_id)
+        print(f"[MIGRATE] user={user_id}: decoded reviews on {updated} record(s)")
+        updated = backfill_severity_totals(user_id)
+        print(f"[MIGRATE] user={user_id}: backfilled severity totals on {updated} submission(s)")
+        updated = migrate_fileids_to_sets(user_id)
+        print(f"[MIGRATE] user={user_id}: converted fileids to sets on {updated} project(s)")
+
+
+if __name__ == '__main__':
+    run_all()
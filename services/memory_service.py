@@ -8,55 +8,262 @@ from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 import os
 import json
+import atexit
+import logging
+import queue
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from cachetools import TTLCache
 import hashlib
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Recommended number of documents per add() call when ingesting in bulk:
+# large enough to amortize the embedding request, small enough to stay under
+# the embedding API's per-request input limits
+INGEST_BATCH_SIZE = 100
+
+# Code is embedded as a summary (head, tail and defined names) rather than in
+# full: embedding APIs bill per token and reject inputs past ~8k tokens, and
+# a whole large file dilutes the match. The raw code, up to
+# MAX_STORED_CODE_CHARS, is kept in metadata for display.
+SUMMARY_MAX_CHARS = 1024
+MAX_STORED_CODE_CHARS = 50_000
+MAX_SUMMARY_NAMES = 50
+_DEFINITION_RE = re.compile(
+    r'^\s*(?:export\s+)?(?:async\s+)?(?:def|class|function|func|fn|interface|struct)\s+([A-Za-z_$][\w$]*)',
+    re.MULTILINE
+)
+
+def _summarize_code(code: str, max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """Return the names a file defines plus its first and last max_chars/2 characters"""
+    names = list(dict.fromkeys(_DEFINITION_RE.findall(code)))[:MAX_SUMMARY_NAMES]
+    if len(code) > max_chars:
+        half = max_chars // 2
+        code = f"{code[:half]}\n...\n{code[-half:]}"
+    if names:
+        return f"Defines: {', '.join(names)}\n{code}"
+    return code
+
+# HNSW parameters per collection size. Code and review collections grow with
+# every submission and are searched for few neighbours, so they get a denser
+# graph and a wider search for recall; the per-user/per-project collections
+# stay small, so a sparser graph saves memory at no recall cost. M and
+# construction_ef only take effect when a collection is first created.
+HNSW_LARGE = {"hnsw:M": 24, "hnsw:construction_ef": 200, "hnsw:search_ef": 80}
+HNSW_SMALL = {"hnsw:M": 8, "hnsw:construction_ef": 64, "hnsw:search_ef": 32}
+
+# Keep loaded HNSW segments in an LRU bounded by this many bytes instead of
+# holding every collection's index in memory
+CHROMA_MEMORY_LIMIT_BYTES = int(os.getenv('CHROMA_MEMORY_LIMIT_BYTES', 2 * 1024 ** 3))
+
+# How long the background writer waits for more queued writes to join a batch
+INGEST_MAX_WAIT = 0.1
+
+# Shared pool for independent lookups (get_enhanced_context, collection
+# stats); they wait on the embedding API and Chroma, so threads overlap them
+CONTEXT_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='memory-context')
+
+class LengthSortedEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """
+    Wraps a local embedding function so large inputs are embedded shortest to
+    longest. The model pads each mini-batch to its longest text, so grouping
+    similar lengths avoids spending most of the compute on padding. Results
+    are returned in the caller's order.
+    """
+    
+    # Inputs up to one model mini-batch gain nothing from reordering
+    MIN_SORT_SIZE = 32
+    
+    def __init__(self, embedding_function):
+        self._embedding_function = embedding_function
+    
+    def __call__(self, input):
+        if len(input) <= self.MIN_SORT_SIZE:
+            return self._embedding_function(input)
+        
+        # Character length is a cheap proxy for token length
+        order = sorted(range(len(input)), key=lambda i: len(input[i]))
+        embeddings = self._embedding_function([input[i] for i in order])
+        
+        result = [None] * len(input)
+        for position, index in enumerate(order):
+            result[index] = embeddings[position]
+        return result
+
+class CachingEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """
+    Wraps an embedding function with an in-process LRU keyed by the SHA-1 of
+    each text, so code that is stored and then searched for, or reviewed
+    again unchanged, is only embedded once. Only the cache misses are sent
+    to the wrapped function.
+    """
+    
+    def __init__(self, embedding_function, maxsize: int = 4096):
+        self._embedding_function = embedding_function
+        self._maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __call__(self, input):
+        keys = [hashlib.sha1(text.encode('utf-8')).digest() for text in input]
+        result = [None] * len(input)
+        misses = {}
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    result[index] = self._cache[key]
+                else:
+                    misses.setdefault(key, []).append(index)
+        if not misses:
+            return result
+        
+        # Embed each distinct missing text once
+        miss_keys = list(misses)
+        embeddings = self._embedding_function([input[misses[key][0]] for key in miss_keys])
+        with self._lock:
+            for key, embedding in zip(miss_keys, embeddings):
+                for index in misses[key]:
+                    result[index] = embedding
+                self._cache[key] = embedding
+                self._cache.move_to_end(key)
+            while len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+        return result
+
+_CLIENT_CACHE: Dict[str, Any] = {}
+_EMBEDDING_FUNCTION_CACHE: Dict[Optional[str], Any] = {}
+_cache_lock = threading.Lock()
+
+def _get_client(persist_directory: str):
+    """Return the process-wide PersistentClient for persist_directory"""
+    path = os.path.abspath(persist_directory)
+    with _cache_lock:
+        if path not in _CLIENT_CACHE:
+            # Use PersistentClient for local persistent storage
+            _CLIENT_CACHE[path] = chromadb.PersistentClient(
+                path=persist_directory,
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True,
+                    chroma_segment_cache_policy="LRU",
+                    chroma_memory_limit_bytes=CHROMA_MEMORY_LIMIT_BYTES
+                )
+            )
+        return _CLIENT_CACHE[path]
+
+def _get_embedding_function():
+    """Return the process-wide embedding function for the configured backend"""
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    with _cache_lock:
+        if openai_api_key not in _EMBEDDING_FUNCTION_CACHE:
+            _EMBEDDING_FUNCTION_CACHE[openai_api_key] = _create_embedding_function(openai_api_key)
+        return _EMBEDDING_FUNCTION_CACHE[openai_api_key]
+
+def _onnx_providers() -> Optional[List[str]]:
+    """ONNX Runtime providers for the local model: CUDA when available, then CPU"""
+    try:
+        import onnxruntime
+    except ImportError:
+        return None
+    available = onnxruntime.get_available_providers()
+    return [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+
+def _torch_device() -> str:
+    """Device for the sentence-transformers fallback: CUDA when available"""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _create_embedding_function(openai_api_key: Optional[str]):
+    """Build the embedding function: OpenAI when a key is set, else the local model"""
+    # Use OpenAI embeddings (you can switch to sentence-transformers for free option)
+    if openai_api_key:
+        embedding_function = embedding_functions.OpenAIEmbeddingFunction(
+            api_key=openai_api_key,
+            model_name="text-embedding-3-small"  # Cheaper and faster
+        )
+    else:
+        # Fallback to free local all-MiniLM-L6-v2. Chroma's ONNX Runtime
+        # build of the model skips PyTorch and embeds several times faster
+        # on CPU, with the same vectors as the sentence-transformers one
+        try:
+            local_function = embedding_functions.ONNXMiniLM_L6_V2(
+                preferred_providers=_onnx_providers()
+            )
+        except (AttributeError, ValueError):
+            # Older chromadb or onnxruntime not installed
+            local_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name="all-MiniLM-L6-v2",
+                device=_torch_device()
+            )
+        
+        # Both models load lazily on first use; load now so the first
+        # review doesn't pay for it
+        try:
+            local_function(["warmup"])
+        except Exception:
+            logger.warning("[MEMORY] Embedding model warmup failed", exc_info=True)
+        embedding_function = LengthSortedEmbeddingFunction(local_function)
+    
+    # Skip re-embedding text seen recently (re-reviews of unchanged code)
+    return CachingEmbeddingFunction(embedding_function)
+
 class MemoryService:
     """
     Manages context memory using ChromaDB for semantic search and retrieval
     """
     
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(self, persist_directory: str = "./chroma_db", client=None, embedding_function=None):
         """
         Initialize ChromaDB client and collections
         
         Args:
             persist_directory: Directory to persist ChromaDB data
+            client: Pre-built Chroma client to use instead of a persistent
+                    one, e.g. chromadb.EphemeralClient() in tests
+                    (persist_directory is then ignored)
+            embedding_function: Embedding function to use instead of the
+                    shared OpenAI/local one, e.g. a cheap stub in tests
         """
         self.persist_directory = persist_directory
         
-        # Create directory if it doesn't exist
-        os.makedirs(persist_directory, exist_ok=True)
-        
-        # Initialize ChromaDB client with persistent storage
-        # Use PersistentClient for local persistent storage
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
-        
-        # Use OpenAI embeddings (you can switch to sentence-transformers for free option)
-        openai_api_key = os.getenv('OPENAI_API_KEY')
-        if openai_api_key:
-            self.embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-                api_key=openai_api_key,
-                model_name="text-embedding-3-small"  # Cheaper and faster
-            )
+        # Clients and embedding models are shared per process: opening a
+        # PersistentClient loads the HNSW indexes from disk, and loading the
+        # local model takes seconds, so neither should happen per instance
+        if client is not None:
+            self.client = client
         else:
-            # Fallback to free sentence transformers
-            self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2"
-            )
+            # Create directory if it doesn't exist
+            os.makedirs(persist_directory, exist_ok=True)
+            self.client = _get_client(persist_directory)
+        if embedding_function is not None:
+            self.embedding_function = embedding_function
+        else:
+            self.embedding_function = _get_embedding_function()
+        
+        # Project context is read on every enhanced-context request but
+        # rarely changes; stores and clears invalidate it
+        self._project_context_cache = TTLCache(maxsize=1024, ttl=300)
+        self._project_context_lock = threading.Lock()
         
         # Create collections for different types of memory
         self._initialize_collections()
+        
+        # Code submissions and review findings are written in the background
+        self._start_ingest_writer()
     
     def _initialize_collections(self):
         """Initialize different ChromaDB collections"""
@@ -65,41 +272,63 @@ class MemoryService:
         self.code_collection = self.client.get_or_create_collection(
             name="code_submissions",
             embedding_function=self.embedding_function,
-            metadata={"description": "Code submissions with file context"}
+            metadata={"description": "Code submissions with file context", **HNSW_LARGE}
         )
         
         # Collection for security review findings
         self.security_collection = self.client.get_or_create_collection(
             name="security_reviews",
             embedding_function=self.embedding_function,
-            metadata={"description": "Security review findings and patterns"}
+            metadata={"description": "Security review findings and patterns", **HNSW_LARGE}
         )
         
         # Collection for logic review findings
         self.logic_collection = self.client.get_or_create_collection(
             name="logic_reviews",
             embedding_function=self.embedding_function,
-            metadata={"description": "Logic errors and patterns"}
+            metadata={"description": "Logic errors and patterns", **HNSW_LARGE}
         )
         
         # Collection for user interactions and preferences
         self.user_collection = self.client.get_or_create_collection(
             name="user_context",
             embedding_function=self.embedding_function,
-            metadata={"description": "User preferences and interaction history"}
+            metadata={"description": "User preferences and interaction history", **HNSW_SMALL}
         )
         
         # Collection for project-level context
         self.project_collection = self.client.get_or_create_collection(
             name="project_context",
             embedding_function=self.embedding_function,
-            metadata={"description": "Project structure and relationships"}
+            metadata={"description": "Project structure and relationships", **HNSW_SMALL}
         )
     
     def _generate_id(self, *components) -> str:
-        """Generate a unique ID from components"""
+        """Generate a deterministic ID from components (same inputs, same document)"""
         combined = "_".join(str(c) for c in components)
         return hashlib.md5(combined.encode()).hexdigest()
+    
+    def _new_id(self) -> str:
+        """Generate a random ID for documents that are never looked up by key"""
+        return uuid.uuid4().hex
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """Embed query text once, summarized exactly as _query_input would query it"""
+        return self.embedding_function([_summarize_code(text)])[0]
+    
+    def _query_input(self, text: str, embedding: Optional[List[float]]) -> Dict[str, Any]:
+        """
+        Query by a precomputed embedding (from _embed_query) when given,
+        otherwise let Chroma embed the text. Text is summarized like stored
+        code, so code queries match code summaries and stay under the
+        embedding API's input limit; short descriptions pass through unchanged.
+        """
+        if embedding is not None:
+            # Local models return numpy arrays; older Chroma only accepts plain lists
+            if hasattr(embedding, 'tolist'):
+                embedding = embedding.tolist()
+            return {"query_embeddings": [embedding]}
+        return {"query_texts": [_summarize_code(text)]}
         
     def store_code_submission(self, 
                              user_id: str, 
@@ -119,37 +348,127 @@ class MemoryService:
             code: Source code
             language: Programming language (optional)
         """
-        doc_id = self._generate_id(user_id, submission_id)
-        
-        # Create a rich context document
-        document = f"""
-        File: {filename}
-        Language: {language or 'unknown'}
-        Code:
-        {code}
-        """
-        
-        metadata = {
+        self.store_code_submissions_batch([{
             "user_id": user_id,
             "submission_id": submission_id,
             "project_id": project_id,
             "filename": filename,
-            "language": language or "unknown",
-            "timestamp": datetime.now().isoformat(),
-            "type": "code_submission"
-        }
+            "code": code,
+            "language": language
+        }])
+    
+    def store_code_submissions_batch(self, items: List[Dict[str, Any]]):
+        """
+        Queue many code submissions for the background writer, which embeds
+        and inserts them INGEST_BATCH_SIZE at a time
         
-        self.code_collection.add(
-            documents=[document],
-            metadatas=[metadata],
-            ids=[doc_id]
+        Args:
+            items: Dicts with the store_code_submission arguments
+                   (user_id, submission_id, project_id, filename, code,
+                   optional language)
+        """
+        timestamp = datetime.now().isoformat()
+        documents, metadatas, ids = [], [], []
+        for item in items:
+            language = item.get('language') or 'unknown'
+            
+            # Create a rich context document (no indentation: every space is an embedding token)
+            documents.append("\n".join([
+                f"File: {item['filename']}",
+                f"Language: {language}",
+                "Code:",
+                _summarize_code(item['code'])
+            ]))
+            metadatas.append({
+                "user_id": item['user_id'],
+                "submission_id": item['submission_id'],
+                "project_id": item['project_id'],
+                "filename": item['filename'],
+                "language": language,
+                "code": item['code'][:MAX_STORED_CODE_CHARS],
+                "timestamp": timestamp,
+                "type": "code_submission"
+            })
+            ids.append(self._generate_id(item['user_id'], item['submission_id']))
+        
+        self._enqueue_add(self.code_collection, documents, metadatas, ids)
+    
+    def _start_ingest_writer(self):
+        """Start the daemon thread that drains queued writes into Chroma"""
+        self._ingest_queue = queue.Queue()
+        self._ingest_thread = threading.Thread(
+            target=self._ingest_loop,
+            name="memory-ingest",
+            daemon=True
         )
+        self._ingest_thread.start()
+        atexit.register(self.flush)
+    
+    def _enqueue_add(self, collection, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+        """Queue documents for the background writer; returns immediately"""
+        if ids:
+            self._ingest_queue.put((collection, documents, metadatas, ids))
+    
+    def _ingest_loop(self):
+        """Collect queued writes for up to INGEST_MAX_WAIT and add them in as few calls as possible"""
+        while True:
+            batch = [self._ingest_queue.get()]
+            deadline = time.monotonic() + INGEST_MAX_WAIT
+            while len(batch) < INGEST_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._ingest_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_batch(batch)
+            except Exception:
+                logger.exception("[MEMORY] Failed to write %d queued item(s)", len(batch))
+            finally:
+                for _ in batch:
+                    self._ingest_queue.task_done()
+    
+    def _write_batch(self, batch):
+        """Merge queued writes per collection and add each collection's documents together"""
+        merged = {}
+        for collection, documents, metadatas, ids in batch:
+            target = merged.setdefault(id(collection), (collection, [], [], [], set()))
+            _, merged_documents, merged_metadatas, merged_ids, seen = target
+            for document, metadata, doc_id in zip(documents, metadatas, ids):
+                # A single add() rejects duplicate ids; keep the first like separate adds would
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                merged_documents.append(document)
+                merged_metadatas.append(metadata)
+                merged_ids.append(doc_id)
+        
+        for collection, documents, metadatas, ids, _ in merged.values():
+            self._add_batched(collection, documents, metadatas, ids)
+    
+    def flush(self):
+        """Block until every queued write has been added to Chroma"""
+        self._ingest_queue.join()
+    
+    def _add_batched(self, collection, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+        """Add documents to a collection in INGEST_BATCH_SIZE chunks (one embedding call each)"""
+        for start in range(0, len(ids), INGEST_BATCH_SIZE):
+            end = start + INGEST_BATCH_SIZE
+            collection.add(
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
     
     def get_similar_code(self, 
                         code_snippet: str,
                         user_id: Optional[str] = None,
                         project_id: Optional[str] = None,
-                        n_results: int = 5) -> List[Dict[str, Any]]:
+                        n_results: int = 5,
+                        embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
         Find similar code submissions
         
@@ -158,6 +477,7 @@ class MemoryService:
             user_id: Filter by user (optional)
             project_id: Filter by project (optional)
             n_results: Number of results to return
+            embedding: Precomputed _embed_query(code_snippet) (optional)
             
         Returns:
             List of similar code submissions with metadata
@@ -169,12 +489,16 @@ class MemoryService:
             where_filter["project_id"] = project_id
         
         results = self.code_collection.query(
-            query_texts=[code_snippet],
+            **self._query_input(code_snippet, embedding),
             where=where_filter if where_filter else None,
             n_results=n_results
         )
         
-        return self._format_results(results)
+        # The document is only a summary; expose the stored source for display
+        formatted = self._format_results(results)
+        for result in formatted:
+            result['code'] = (result['metadata'] or {}).get('code')
+        return formatted
         
     def store_security_review(self,
                              user_id: str,
@@ -188,7 +512,9 @@ class MemoryService:
             project_id: Project ID
             review_data: Security review JSON data
         """
-        review_id = self._generate_id(user_id, project_id, datetime.now().isoformat())
+        review_id = self._new_id()
+        timestamp = review_data.get('review_time') or datetime.now().isoformat()
+        documents, metadatas, ids = [], [], []
         
         # Extract issues and create searchable documents
         files = review_data.get('files', [])
@@ -198,37 +524,39 @@ class MemoryService:
             
             for issue_idx, issue in enumerate(issues):
                 issue_id = f"{review_id}_file{file_idx}_issue{issue_idx}"
+                severity = issue.get('severity') or {}
+                level = severity.get('level')
                 
                 # Create rich document
-                document = f"""
-                Security Issue in {filename}
-                Line: {issue.get('line', 'N/A')}
-                Severity: {issue.get('severity', {}).get('level', 'unknown')}
-                Finding: {issue.get('feedback', '')}
-                """
+                document = "\n".join([
+                    f"Security Issue in {filename}",
+                    f"Line: {issue.get('line', 'N/A')}",
+                    f"Severity: {level or 'unknown'}",
+                    f"Finding: {issue.get('feedback', '')}"
+                ])
                 
-                metadata = {
+                documents.append(document)
+                metadatas.append({
                     "user_id": user_id,
                     "project_id": project_id,
                     "filename": filename,
                     "line": issue.get('line', 0),
-                    "severity": issue.get('severity', {}).get('level', 'low'),
-                    "score": issue.get('severity', {}).get('score', 1),
-                    "timestamp": review_data.get('review_time', datetime.now().isoformat()),
+                    "severity": level or 'low',
+                    "score": severity.get('score', 1),
+                    "timestamp": timestamp,
                     "type": "security_issue"
-                }
-                
-                self.security_collection.add(
-                    documents=[document],
-                    metadatas=[metadata],
-                    ids=[issue_id]
-                )
+                })
+                ids.append(issue_id)
+        
+        # One queued insert for the whole review instead of one add per issue
+        self._enqueue_add(self.security_collection, documents, metadatas, ids)
     
     def get_similar_security_issues(self,
                                    issue_description: str,
                                    user_id: Optional[str] = None,
                                    project_id: Optional[str] = None,
-                                   n_results: int = 5) -> List[Dict[str, Any]]:
+                                   n_results: int = 5,
+                                   embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
         Find similar security issues from past reviews
         
@@ -237,6 +565,7 @@ class MemoryService:
             user_id: Filter by user (optional)
             project_id: Filter by project (optional)
             n_results: Number of results to return
+            embedding: Precomputed _embed_query(issue_description) (optional)
             
         Returns:
             List of similar security issues
@@ -248,7 +577,7 @@ class MemoryService:
             where_filter["project_id"] = project_id
         
         results = self.security_collection.query(
-            query_texts=[issue_description],
+            **self._query_input(issue_description, embedding),
             where=where_filter if where_filter else None,
             n_results=n_results
         )
@@ -269,7 +598,9 @@ class MemoryService:
             project_id: Project ID
             review_data: Logic review JSON data
         """
-        review_id = self._generate_id(user_id, submission_id, datetime.now().isoformat())
+        review_id = self._new_id()
+        timestamp = review_data.get('review_time') or datetime.now().isoformat()
+        documents, metadatas, ids = [], [], []
         
         files = review_data.get('files', [])
         for file_idx, file_data in enumerate(files):
@@ -277,40 +608,42 @@ class MemoryService:
             
             for error_idx, error in enumerate(errors):
                 error_id = f"{review_id}_file{file_idx}_error{error_idx}"
+                function = error.get('function', 'unknown')
                 
-                document = f"""
-                Logic Error in function: {error.get('function', 'unknown')}
-                Issue: {error.get('feedback', '')}
-                """
+                document = "\n".join([
+                    f"Logic Error in function: {function}",
+                    f"Issue: {error.get('feedback', '')}"
+                ])
                 
-                metadata = {
+                documents.append(document)
+                metadatas.append({
                     "user_id": user_id,
                     "submission_id": submission_id,
                     "project_id": project_id,
-                    "function": error.get('function', 'unknown'),
-                    "timestamp": review_data.get('review_time', datetime.now().isoformat()),
+                    "function": function,
+                    "timestamp": timestamp,
                     "type": "logic_error"
-                }
-                
-                self.logic_collection.add(
-                    documents=[document],
-                    metadatas=[metadata],
-                    ids=[error_id]
-                )
+                })
+                ids.append(error_id)
+        
+        # One queued insert for the whole review instead of one add per error
+        self._enqueue_add(self.logic_collection, documents, metadatas, ids)
     
     def get_similar_logic_errors(self,
                                 error_description: str,
                                 user_id: Optional[str] = None,
-                                n_results: int = 5) -> List[Dict[str, Any]]:
+                                n_results: int = 5,
+                                embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
-        Find similar logic errors from past reviews
+        Find similar logic errors from past reviews. embedding, when given, is
+        a precomputed _embed_query(error_description).
         """
         where_filter = {"type": "logic_error"}
         if user_id:
             where_filter["user_id"] = user_id
         
         results = self.logic_collection.query(
-            query_texts=[error_description],
+            **self._query_input(error_description, embedding),
             where=where_filter if where_filter else None,
             n_results=n_results
         )
@@ -332,7 +665,7 @@ class MemoryService:
             context: Context text
             metadata: Additional metadata
         """
-        interaction_id = self._generate_id(user_id, datetime.now().isoformat())
+        interaction_id = self._new_id()
         
         meta = {
             "user_id": user_id,
@@ -384,11 +717,11 @@ class MemoryService:
         """
         doc_id = self._generate_id(user_id, project_id)
         
-        document = f"""
-        Project: {project_name}
-        Description: {project_desc}
-        Files: {', '.join(file_structure)}
-        """
+        document = "\n".join([
+            f"Project: {project_name}",
+            f"Description: {project_desc}",
+            f"Files: {', '.join(file_structure)}"
+        ])
         
         metadata = {
             "user_id": user_id,
@@ -404,6 +737,8 @@ class MemoryService:
             metadatas=[metadata],
             ids=[doc_id]
         )
+        with self._project_context_lock:
+            self._project_context_cache.pop(doc_id, None)
     
     def get_project_context(self,
                            user_id: str,
@@ -412,6 +747,10 @@ class MemoryService:
         Get project context
         """
         doc_id = self._generate_id(user_id, project_id)
+        with self._project_context_lock:
+            cached = self._project_context_cache.get(doc_id)
+        if cached is not None:
+            return cached
         
         try:
             result = self.project_collection.get(
@@ -420,10 +759,13 @@ class MemoryService:
             )
             
             if result['ids']:
-                return {
+                context = {
                     'document': result['documents'][0],
                     'metadata': result['metadatas'][0]
                 }
+                with self._project_context_lock:
+                    self._project_context_cache[doc_id] = context
+                return context
         except Exception:
             pass
         
@@ -446,68 +788,82 @@ class MemoryService:
         Returns:
             Dictionary with enhanced context for AI
         """
-        context = {
-            "similar_code": [],
-            "past_issues": [],
-            "project_context": None,
-            "user_preferences": []
-        }
+        # Start the lookups that don't embed current_code, then embed it
+        # once for the code and past-issue searches
+        project_context = CONTEXT_EXECUTOR.submit(self.get_project_context, user_id, project_id)
+        
+        user_preferences = CONTEXT_EXECUTOR.submit(
+            self.get_user_context,
+            user_id,
+            f"preferences for {review_type} review",
+            n_results=2
+        )
+        
+        # Same query input the searches would build from current_code themselves
+        embedding = self._embed_query(current_code)
         
-        # Get similar code
-        context["similar_code"] = self.get_similar_code(
+        similar_code = CONTEXT_EXECUTOR.submit(
+            self.get_similar_code,
             current_code,
             user_id=user_id,
             project_id=project_id,
-            n_results=3
+            n_results=3,
+            embedding=embedding
         )
         
         # Get past issues based on review type
+        past_issues = None
         if review_type == "security":
-            context["past_issues"] = self.get_similar_security_issues(
+            past_issues = CONTEXT_EXECUTOR.submit(
+                self.get_similar_security_issues,
                 current_code,
                 user_id=user_id,
                 project_id=project_id,
-                n_results=3
+                n_results=3,
+                embedding=embedding
             )
         elif review_type == "logic":
-            context["past_issues"] = self.get_similar_logic_errors(
+            past_issues = CONTEXT_EXECUTOR.submit(
+                self.get_similar_logic_errors,
                 current_code,
                 user_id=user_id,
-                n_results=3
+                n_results=3,
+                embedding=embedding
             )
         
-        # Get project context
-        context["project_context"] = self.get_project_context(user_id, project_id)
-        
-        # Get user preferences
-        context["user_preferences"] = self.get_user_context(
-            user_id,
-            f"preferences for {review_type} review",
-            n_results=2
-        )
+        context = {
+            "similar_code": similar_code.result(),
+            "past_issues": past_issues.result() if past_issues else [],
+            "project_context": project_context.result(),
+            "user_preferences": user_preferences.result()
+        }
         
         return context
     
     
     def _format_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Format ChromaDB query results into a cleaner structure"""
-        formatted = []
-        
         if not results['ids'] or not results['ids'][0]:
-            return formatted
-        
-        for i in range(len(results['ids'][0])):
-            formatted.append({
-                'id': results['ids'][0][i],
-                'document': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'distance': results['distances'][0][i] if 'distances' in results else None
-            })
+            return []
         
-        return formatted
+        # Results are per query text; we always send exactly one
+        ids = results['ids'][0]
+        documents = results['documents'][0]
+        metadatas = results['metadatas'][0]
+        distances = results['distances'][0] if results.get('distances') else [None] * len(ids)
+        
+        return [
+            {'id': doc_id, 'document': document, 'metadata': metadata, 'distance': distance}
+            for doc_id, document, metadata, distance in zip(ids, documents, metadatas, distances)
+        ]
     
     def clear_user_data(self, user_id: str):
         """Clear all data for a specific user (GDPR compliance)"""
+        # Queued writes must land before the delete, not after it
+        self.flush()
+        with self._project_context_lock:
+            self._project_context_cache.clear()
+        
         collections = [
             self.code_collection,
             self.security_collection,
@@ -517,21 +873,19 @@ class MemoryService:
         ]
         
         for collection in collections:
-            # Get all documents for this user
-            results = collection.get(
-                where={"user_id": user_id},
-                include=[]
-            )
-            
-            if results['ids']:
-                collection.delete(ids=results['ids'])
+            # Filter in the storage layer instead of fetching every id first
+            collection.delete(where={"user_id": user_id})
     
     def get_collection_stats(self) -> Dict[str, int]:
         """Get statistics about stored data"""
-        return {
-            "code_submissions": self.code_collection.count(),
-            "security_reviews": self.security_collection.count(),
-            "logic_reviews": self.logic_collection.count(),
-            "user_interactions": self.user_collection.count(),
-            "projects": self.project_collection.count()
+        collections = {
+            "code_submissions": self.code_collection,
+            "security_reviews": self.security_collection,
+            "logic_reviews": self.logic_collection,
+            "user_interactions": self.user_collection,
+            "projects": self.project_collection
         }
+        
+        # Count all collections concurrently
+        counts = CONTEXT_EXECUTOR.map(lambda collection: collection.count(), collections.values())
+        return dict(zip(collections, counts))
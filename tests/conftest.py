@@ -0,0 +1,259 @@
+import copy
+import functools
+import itertools
+import json
+import os
+import sys
+import uuid
+from types import ModuleType
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+
+# Canned LLM replies: minimal valid structures for logic and testing reviews.
+# The app never mutates a parsed review, so the dicts can be shared.
+LOGIC_REVIEW = {
+    "review_time": "2025-01-01T00:00:00Z",
+    "files": [
+        {"logic Errors": [{"function": "foo", "feedback": "Potential issue"}]}
+    ]
+}
+
+TESTING_REVIEW = {
+    "review_time": "2025-01-01T00:00:00Z",
+    "files": [
+        {
+            "code_content": "def foo():\n    return 1",
+            "test_cases": [
+                {
+                    "id": "TC001",
+                    "description": "basic",
+                    "input": [],
+                    "expected_output": 1,
+                    "test_type": "positive",
+                    "notes": ""
+                }
+            ]
+        }
+    ]
+}
+
+
+@pytest.fixture(scope="session")
+def dummy_service_account(tmp_path_factory):
+    """Path to a placeholder service account file, written once per session"""
+    path = tmp_path_factory.mktemp('firebase') / 'dummy_service_account.json'
+    path.write_text(json.dumps({"type": "service_account", "project_id": "dummy"}))
+    return str(path)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def mock_firebase_and_llm(dummy_service_account):
+    """
+    Install firebase_admin and SecureBYTE_AI stubs once per test session.
+    `app` binds these modules when it is first imported, so every test
+    shares them; the in-memory store is cleared between tests instead.
+    """
+    mp = MonkeyPatch()
+
+    # Mock firebase_admin credentials and db
+    class DummyCred:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    in_memory_db = {}
+    push_ids = itertools.count()
+
+    def split(path):
+        return [part for part in path.strip('/').split('/') if part]
+
+    def walk(parts, create=False):
+        """Return the node at parts (None if missing), creating parents when asked"""
+        node = in_memory_db
+        for part in parts:
+            if not isinstance(node, dict):
+                return None
+            if part not in node:
+                if not create:
+                    return None
+                node[part] = {}
+            elif create and isinstance(node[part], list):
+                # Firebase arrays are index-keyed objects, so paths can write into them
+                node[part] = {str(index): item for index, item in enumerate(node[part])}
+            node = node[part]
+        return node
+
+    def write(parts, value):
+        """Set value at parts like Firebase: None deletes, emptied parents disappear"""
+        if not parts:
+            in_memory_db.clear()
+            if value is not None:
+                in_memory_db.update(copy.deepcopy(value))
+            return
+        if value is None:
+            parent = walk(parts[:-1])
+            if isinstance(parent, dict):
+                parent.pop(parts[-1], None)
+                # Firebase has no empty nodes
+                for depth in range(len(parts) - 1, 0, -1):
+                    node = walk(parts[:depth])
+                    if node:
+                        break
+                    walk(parts[:depth - 1]).pop(parts[depth - 1], None)
+            return
+        parent = walk(parts[:-1], create=True)
+        parent[parts[-1]] = copy.deepcopy(value)
+
+    class DummyQuery:
+        def __init__(self, ref, child):
+            self.ref = ref
+            self.child = child
+            self.value = None
+
+        def equal_to(self, value):
+            self.value = value
+            return self
+
+        def get(self):
+            node = self.ref.get() or {}
+            return {key: item for key, item in node.items()
+                    if isinstance(item, dict) and item.get(self.child) == self.value}
+
+    class DummyRef:
+        """Nested-dict stand-in for firebase_admin.db.Reference"""
+        def __init__(self, path):
+            self.parts = split(path)
+            self.path = '/'.join(self.parts)
+            self.key = self.parts[-1] if self.parts else None
+
+        def child(self, path):
+            return DummyDB.reference(f'{self.path}/{path}')
+
+        def get(self, shallow=False):
+            node = walk(self.parts)
+            if shallow and isinstance(node, dict):
+                return dict.fromkeys(node, True)
+            return copy.deepcopy(node)
+
+        def set(self, value):
+            write(self.parts, value)
+
+        def update(self, updates):
+            # Keys may be multi-segment paths relative to this reference
+            for path, value in updates.items():
+                write(self.parts + split(path), value)
+
+        def delete(self):
+            write(self.parts, None)
+
+        def push(self, value=None):
+            ref = self.child(f'-push{next(push_ids):08d}')
+            if value is not None:
+                ref.set(value)
+            return ref
+
+        def transaction(self, update):
+            value = update(self.get())
+            self.set(value)
+            return value
+
+        def order_by_child(self, child):
+            return DummyQuery(self, child)
+
+    class DummyDB:
+        @staticmethod
+        @functools.lru_cache(maxsize=None)
+        def reference(path='/'):
+            # Refs only hold their path, so one instance per path is shared
+            return DummyRef(path)
+
+    mp.setenv('FIREBASE_SERVICE_ACCOUNT', dummy_service_account)
+
+    # Build a proper package-like structure for firebase_admin
+    mod_firebase_admin = ModuleType('firebase_admin')
+    mod_firebase_admin.initialize_app = lambda *args, **kwargs: None
+
+    mod_credentials = ModuleType('firebase_admin.credentials')
+    mod_credentials.Certificate = lambda path: DummyCred()
+
+    mod_db = ModuleType('firebase_admin.db')
+    mod_db.reference = DummyDB.reference
+
+    # Attach attributes so `from firebase_admin import credentials, db` works
+    setattr(mod_firebase_admin, 'credentials', mod_credentials)
+    setattr(mod_firebase_admin, 'db', mod_db)
+
+    # Mock LLMManager in backend app import path to return deterministic reviews
+    class FakeLLM:
+        """Returns the parsed review; handle_llm_review passes dicts through unparsed"""
+        def generate_response(self, user_prompt: str, system_prompt: str = None, custom_config=None):
+            if 'logic' in user_prompt.lower():
+                return LOGIC_REVIEW
+            return TESTING_REVIEW
+
+    # Mock SecureBYTE_AI.main as a real module with LLMManager
+    mod_secure_ai = ModuleType('SecureBYTE_AI')
+    mod_secure_ai_main = ModuleType('SecureBYTE_AI.main')
+    mod_secure_ai_main.LLMManager = lambda: FakeLLM()
+    setattr(mod_secure_ai, 'main', mod_secure_ai_main)
+
+    # Register all stubs in sys.modules in one update, remembering what they replace
+    patch_modules = {
+        'firebase_admin': mod_firebase_admin,
+        'firebase_admin.credentials': mod_credentials,
+        'firebase_admin.db': mod_db,
+        'SecureBYTE_AI': mod_secure_ai,
+        'SecureBYTE_AI.main': mod_secure_ai_main,
+    }
+    replaced = {name: sys.modules[name] for name in patch_modules if name in sys.modules}
+    sys.modules.update(patch_modules)
+
+    yield in_memory_db
+
+    for name in patch_modules:
+        sys.modules.pop(name, None)
+    sys.modules.update(replaced)
+    mp.undo()
+
+
+@pytest.fixture(autouse=True)
+def clean_db(mock_firebase_and_llm):
+    """Start every test with an empty in-memory database"""
+    mock_firebase_and_llm.clear()
+    # Per-test user ids would otherwise grow the shared ref cache all session
+    sys.modules['firebase_admin.db'].reference.cache_clear()
+    # The app caches per-user reads for a few seconds; drop them with the data
+    backend = sys.modules.get('app')
+    if backend is not None:
+        backend.PROJECTS_CACHE.clear()
+        backend.SUBMISSIONS_CACHE.clear()
+    yield mock_firebase_and_llm
+
+
+@pytest.fixture
+def user_id():
+    """A fresh user id per test so runs (including pytest -n auto) never share data"""
+    return f"u_{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture(scope="session")
+def _app(mock_firebase_and_llm):
+    """Import the Flask app once, after the stubs are in place"""
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    import app as backend
+    backend.app.config['TESTING'] = True
+    # Disable rate limiting during tests to avoid 429s from per-route limits
+    try:
+        backend.limiter.enabled = False  # Flask-Limiter >=3 supports toggling enabled
+    except Exception:
+        pass
+    return backend.app
+
+
+@pytest.fixture(scope="session")
+def client(_app):
+    # The tests don't rely on cookies, so one client serves the whole session
+    return _app.test_client()
@@ -2,7 +2,15 @@ import os
 import sys
 import json
 import types
-from copy import deepcopy
+
+# Everything stored here is JSON, so a JSON round trip is a faster deep copy
+try:
+    import orjson
+
+    def _clone(data):
+        return orjson.loads(orjson.dumps(data))
+except ImportError:
+    from copy import deepcopy as _clone
 
 
 # -------------------- Mock firebase_admin --------------------
@@ -29,18 +37,18 @@ class MockDBRef:
                 return None
             node = node[part]
         # Return a deep copy to mimic DB behavior
-        return deepcopy(node)
+        return _clone(node)
 
     def set(self, data):
         parent, key = _walk_to_parent(self.parts)
-        parent[key] = deepcopy(data)
+        parent[key] = _clone(data)
 
     def update(self, data):
         parent, key = _walk_to_parent(self.parts)
         if key not in parent or not isinstance(parent.get(key), dict):
             parent[key] = {}
         target = parent[key]
-        target.update(deepcopy(data))
+        target.update(_clone(data))
 
     def delete(self):
         parent, key = _walk_to_parent(self.parts)
@@ -1,138 +1,11 @@
 import json
-import os
 import builtins
 import types
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 
-# Ensure required env var is set to avoid initialization failure in app import
-os.environ.setdefault('FIREBASE_SERVICE_ACCOUNT', os.path.join(os.path.dirname(__file__), 'dummy_service_account.json'))
-
-
-@pytest.fixture(autouse=True)
-def mock_firebase_and_llm(monkeypatch, tmp_path):
-    # Mock firebase_admin credentials and db
-    class DummyCred:
-        def __init__(self, *args, **kwargs):
-            pass
-
-    class DummyRef:
-        def __init__(self, path, store):
-            self.path = path
-            self.store = store
-
-        def get(self):
-            return self.store.get(self.path)
-
-        def set(self, value):
-            self.store[self.path] = value
-
-        def update(self, updates):
-            current = self.store.get(self.path, {})
-            current.update(updates)
-            self.store[self.path] = current
-
-        def delete(self):
-            self.store.pop(self.path, None)
-
-    in_memory_db = {}
-
-    class DummyDB:
-        @staticmethod
-        def reference(path):
-            return DummyRef(path, in_memory_db)
-
-    dummy_service_account = tmp_path / 'dummy_service_account.json'
-    dummy_service_account.write_text(json.dumps({"type": "service_account", "project_id": "dummy"}))
-    monkeypatch.setenv('FIREBASE_SERVICE_ACCOUNT', str(dummy_service_account))
-
-    # Mock firebase_admin module parts used in app
-    import types as _types
-    import types
-    from types import ModuleType
-
-    # Build a proper package-like structure for firebase_admin
-    mod_firebase_admin = ModuleType('firebase_admin')
-    mod_firebase_admin.initialize_app = lambda *args, **kwargs: None
-
-    mod_credentials = ModuleType('firebase_admin.credentials')
-    mod_credentials.Certificate = lambda path: DummyCred()
-
-    mod_db = ModuleType('firebase_admin.db')
-    mod_db.reference = DummyDB.reference
-
-    # Register in sys.modules and link submodules
-    monkeypatch.setitem(os.sys.modules, 'firebase_admin', mod_firebase_admin)
-    monkeypatch.setitem(os.sys.modules, 'firebase_admin.credentials', mod_credentials)
-    monkeypatch.setitem(os.sys.modules, 'firebase_admin.db', mod_db)
-    # Attach attributes so `from firebase_admin import credentials, db` works
-    setattr(mod_firebase_admin, 'credentials', mod_credentials)
-    setattr(mod_firebase_admin, 'db', mod_db)
-
-    # Mock LLMManager in backend app import path to return deterministic JSON
-    class FakeLLM:
-        def __init__(self):
-            pass
-
-        def generate_response(self, user_prompt: str, system_prompt: str = None, custom_config=None):
-            # Return valid JSON depending on prompt content
-            # Minimal valid structures for both logic and testing
-            if 'Logic' in user_prompt or 'logic' in user_prompt:
-                return json.dumps({
-                    "review_time": "2025-01-01T00:00:00Z",
-                    "files": [
-                        {"logic Errors": [{"function": "foo", "feedback": "Potential issue"}]}
-                    ]
-                })
-            else:
-                return json.dumps({
-                    "review_time": "2025-01-01T00:00:00Z",
-                    "files": [
-                        {
-                            "code_content": "def foo():\n    return 1",
-                            "test_cases": [
-                                {
-                                    "id": "TC001",
-                                    "description": "basic",
-                                    "input": [],
-                                    "expected_output": 1,
-                                    "test_type": "positive",
-                                    "notes": ""
-                                }
-                            ]
-                        }
-                    ]
-                })
-
-    # Mock SecureBYTE_AI.main as a real module with LLMManager
-    mod_secure_ai = ModuleType('SecureBYTE_AI')
-    mod_secure_ai_main = ModuleType('SecureBYTE_AI.main')
-    mod_secure_ai_main.LLMManager = lambda: FakeLLM()
-    monkeypatch.setitem(os.sys.modules, 'SecureBYTE_AI', mod_secure_ai)
-    monkeypatch.setitem(os.sys.modules, 'SecureBYTE_AI.main', mod_secure_ai_main)
-    setattr(mod_secure_ai, 'main', mod_secure_ai_main)
-
-    yield
-
-
-@pytest.fixture
-def client(mock_firebase_and_llm):
-    # Import app after mocks are in place
-    import sys
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    if base_dir not in sys.path:
-        sys.path.insert(0, base_dir)
-    import app as backend
-    backend.app.config['TESTING'] = True
-    # Disable rate limiting during tests to avoid 429s from per-route limits
-    try:
-        backend.limiter.enabled = False  # Flask-Limiter >=3 supports toggling enabled
-    except Exception:
-        pass
-    return backend.app.test_client()
-
-
 def _project_ref_path(user_id, project_id):
     return f'users/{user_id}/projects/{project_id}'
 
@@ -141,12 +14,11 @@ def _submission_ref_path(user_id, submission_id):
     return f'users/{user_id}/submissions/{submission_id}'
 
 
-def test_logic_review_happy_path(client):
-    user_id = 'u1'
+def test_logic_review_happy_path(client, user_id):
     # Create project
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p1"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
 
     # Create submission
     resp = client.post(
@@ -154,7 +26,7 @@ def test_logic_review_happy_path(client):
         json={"filename": "file.py", "code": "def foo():\n    return 1"},
     )
     assert resp.status_code == 201
-    submission_id = resp.get_json()["id"]
+    submission_id = resp.get_json()["data"]["id"]
 
     # Call logic review
     resp = client.post(
@@ -164,17 +36,16 @@ def test_logic_review_happy_path(client):
     assert resp.status_code == 200
     body = resp.get_json()
     assert body["success"] is True
-    assert body["review_type"] == "logic"
-    assert body["submission_id"] == submission_id
-    assert isinstance(body["response"], dict)
+    assert body["data"]["review_type"] == "logic"
+    assert body["data"]["submission_id"] == submission_id
+    assert isinstance(body["data"]["response"], dict)
 
 
-def test_testing_review_happy_path(client):
-    user_id = 'u2'
+def test_testing_review_happy_path(client, user_id):
     # Create project
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p2"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
 
     # Create submission
     resp = client.post(
@@ -182,7 +53,7 @@ def test_testing_review_happy_path(client):
         json={"filename": "file.py", "code": "def foo():\n    return 1"},
     )
     assert resp.status_code == 201
-    submission_id = resp.get_json()["id"]
+    submission_id = resp.get_json()["data"]["id"]
 
     # Call testing review
     resp = client.post(
@@ -192,18 +63,17 @@ def test_testing_review_happy_path(client):
     assert resp.status_code == 200
     body = resp.get_json()
     assert body["success"] is True
-    assert body["review_type"] == "testing"
-    assert body["submission_id"] == submission_id
-    assert isinstance(body["response"], dict)
+    assert body["data"]["review_type"] == "testing"
+    assert body["data"]["submission_id"] == submission_id
+    assert isinstance(body["data"]["response"], dict)
 
 
 
-def test_security_review_happy_path(client):
-    user_id = 'u3'
+def test_security_review_happy_path(client, user_id):
     # Create project
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p3"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
 
     # Create submission
     resp = client.post(
@@ -220,31 +90,30 @@ def test_security_review_happy_path(client):
     assert resp.status_code == 200
     body = resp.get_json()
     assert body["success"] is True
-    assert body["review_type"] == "security"
-    assert body["project_id"] == project_id
-    assert isinstance(body["response"], dict)
+    assert body["data"]["review_type"] == "security"
+    assert body["data"]["project_id"] == project_id
+    assert isinstance(body["data"]["response"], dict)
 
 
-def test_logic_review_accepts_dict_response(client, monkeypatch):
+def test_logic_review_accepts_dict_response(client, monkeypatch, user_id):
     """The LLM may return a Python dict; backend should treat it as success."""
-    user_id = 'u4'
     # Create project and submission
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p4"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
     resp = client.post(
         f"/users/{user_id}/projects/{project_id}/submissions",
         json={"filename": "file.py", "code": "def foo():\n    return 1"},
     )
     assert resp.status_code == 201
-    submission_id = resp.get_json()["id"]
+    submission_id = resp.get_json()["data"]["id"]
 
     # Patch app.llm to return a Python dict
     import app as backend
     class DictLLM:
         def generate_response(self, user_prompt: str, system_prompt: str = None, custom_config=None):
             return {"review_time": "t", "files": []}
-    backend.llm = DictLLM()
+    monkeypatch.setattr(backend, "llm", DictLLM())
 
     resp = client.post(
         f"/users/{user_id}/submissions/{submission_id}/logic-review",
@@ -253,26 +122,25 @@ def test_logic_review_accepts_dict_response(client, monkeypatch):
     assert resp.status_code == 200
     data = resp.get_json()
     assert data.get("success") is True
-    assert isinstance(data.get("response"), dict)
+    assert isinstance(data["data"]["response"], dict)
 
 
-def test_testing_review_accepts_dict_response(client, monkeypatch):
-    user_id = 'u5'
+def test_testing_review_accepts_dict_response(client, monkeypatch, user_id):
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p5"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
     resp = client.post(
         f"/users/{user_id}/projects/{project_id}/submissions",
         json={"filename": "file.py", "code": "def foo():\n    return 1"},
     )
     assert resp.status_code == 201
-    submission_id = resp.get_json()["id"]
+    submission_id = resp.get_json()["data"]["id"]
 
     import app as backend
     class DictLLM:
         def generate_response(self, *_args, **_kwargs):
             return {"review_time": "t", "files": []}
-    backend.llm = DictLLM()
+    monkeypatch.setattr(backend, "llm", DictLLM())
 
     resp = client.post(
         f"/users/{user_id}/submissions/{submission_id}/testing-review",
@@ -281,22 +149,55 @@ def test_testing_review_accepts_dict_response(client, monkeypatch):
     assert resp.status_code == 200
     data = resp.get_json()
     assert data.get("success") is True
-    assert isinstance(data.get("response"), dict)
+    assert isinstance(data["data"]["response"], dict)
+
 
+TEXT_REVIEW = {"review_time": "t", "files": [{"logic Errors": []}]}
 
-def test_logic_review_accepts_content_alias(client):
+
+@pytest.mark.parametrize("raw", [
+    "```json\n" + json.dumps(TEXT_REVIEW, indent=2) + "\n```",
+    json.dumps(TEXT_REVIEW).encode(),
+    json.dumps(TEXT_REVIEW).encode().replace(b'"t"', b'"t\xff"'),
+], ids=["fenced-str", "bytes", "bytes-invalid-utf8"])
+def test_logic_review_parses_text_response(client, monkeypatch, user_id, raw):
+    """String and bytes LLM output is cleaned and parsed into the review object."""
+    resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p8"})
+    assert resp.status_code == 201
+    project_id = resp.get_json()["data"]["projectid"]
+    resp = client.post(
+        f"/users/{user_id}/projects/{project_id}/submissions",
+        json={"filename": "file.py", "code": "def foo():\n    return 1"},
+    )
+    assert resp.status_code == 201
+    submission_id = resp.get_json()["data"]["id"]
+
+    import app as backend
+    class TextLLM:
+        def generate_response(self, *_args, **_kwargs):
+            return raw
+    monkeypatch.setattr(backend, "llm", TextLLM())
+
+    resp = client.post(
+        f"/users/{user_id}/submissions/{submission_id}/logic-review",
+        json={"code": "print(1)"},
+    )
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    assert resp.get_json()["data"]["response"] == TEXT_REVIEW
+
+
+def test_logic_review_accepts_content_alias(client, user_id):
     """Payload with 'content' (alias for code) should be accepted."""
-    user_id = 'u6'
     # Create project and submission
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p6"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
     resp = client.post(
         f"/users/{user_id}/projects/{project_id}/submissions",
         json={"filename": "file.py", "code": "print(0)"},
     )
     assert resp.status_code == 201
-    submission_id = resp.get_json()["id"]
+    submission_id = resp.get_json()["data"]["id"]
 
     resp = client.post(
         f"/users/{user_id}/submissions/{submission_id}/logic-review",
@@ -305,17 +206,16 @@ def test_logic_review_accepts_content_alias(client):
     assert resp.status_code == 200, resp.get_data(as_text=True)
 
 
-def test_logic_review_missing_code_returns_clear_error(client):
-    user_id = 'u7'
+def test_logic_review_missing_code_returns_clear_error(client, user_id):
     resp = client.post(f"/users/{user_id}/projects", json={"project_name": "p7"})
     assert resp.status_code == 201
-    project_id = resp.get_json()["projectid"]
+    project_id = resp.get_json()["data"]["projectid"]
     resp = client.post(
         f"/users/{user_id}/projects/{project_id}/submissions",
         json={"filename": "file.py", "code": "print(0)"},
     )
     assert resp.status_code == 201
-    submission_id = resp.get_json()["id"]
+    submission_id = resp.get_json()["data"]["id"]
 
     # Send empty body
     resp = client.post(
@@ -326,3 +226,39 @@ def test_logic_review_missing_code_returns_clear_error(client):
     data = resp.get_json()
     assert "error" in data
 
+
+def test_concurrent_logic_reviews(_app, clean_db, user_id):
+    """Logic reviews posted at once for several submissions each land on their own submission"""
+    import app as backend
+
+    client = _app.test_client()
+    resp = client.post(f"/users/{user_id}/projects", json={"project_name": "concurrent"})
+    assert resp.status_code == 201
+    project_id = resp.get_json()["data"]["projectid"]
+
+    submission_ids = []
+    for i in range(8):
+        resp = client.post(
+            f"/users/{user_id}/projects/{project_id}/submissions",
+            json={"filename": f"file{i}.py", "code": f"def foo():\n    return {i}"},
+        )
+        assert resp.status_code == 201
+        submission_ids.append(resp.get_json()["data"]["id"])
+
+    def review(submission_id):
+        # One client per thread; requests share the app, not a cookie jar
+        return _app.test_client().post(
+            f"/users/{user_id}/submissions/{submission_id}/logic-review",
+            json={"code": "def foo():\n    return 1"},
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(review, submission_ids))
+
+    assert [r.status_code for r in responses] == [200] * len(submission_ids)
+    assert [r.get_json()["data"]["submission_id"] for r in responses] == submission_ids
+
+    # Reviews are appended by the background writer; wait for it to drain
+    backend.REVIEW_WRITER.submit(lambda: None).result()
+    submissions = clean_db["users"][user_id]["submissions"]
+    assert all(len(submissions[sid]["logicrev"]) == 1 for sid in submission_ids)
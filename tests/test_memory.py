@@ -1,234 +1,235 @@
 """
-Test script for Memory Service
-Run this to verify ChromaDB integration is working
+Tests for Memory Service
+Run with pytest, or as a script to verify ChromaDB integration is working
 """
 
 import sys
 import os
-import shutil
+import hashlib
+
+import pytest
+
+# Skip the whole module rather than erroring at collection when chromadb isn't installed
+chromadb = pytest.importorskip("chromadb")
+from chromadb.utils import embedding_functions
 
 # Add parent directory to path
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
 
-from services.memory_service import MemoryService
+from services.memory_service import MemoryService, _summarize_code
 from datetime import datetime
 import json
 
-def test_memory_service():
-    """Test all memory service functionality"""
-    
-    print("="*60)
-    print("Testing SecureBYTE Memory Service")
-    print("="*60)
-    
-    # Initialize
-    print("\n1. Initializing Memory Service (PersistentClient)...")
-    try:
-        memory = MemoryService(persist_directory="./test_chroma_db")
-        print("✓ Memory service initialized successfully")
-        print("✓ Using PersistentClient - data will persist to disk")
-    except Exception as e:
-        print(f"✗ Failed to initialize: {e}")
-        return
+TEST_USER = "test_user_123"
+
+
+class HashEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """Deterministic 8-dim vectors from a text hash, so tests never load a model"""
     
-    # Test storage
-    print("\n2. Testing Code Submission Storage...")
-    try:
-        memory.store_code_submission(
-            user_id="test_user_123",
-            submission_id="sub_001",
-            project_id="proj_001",
-            filename="example.py",
-            code="""
+    def __call__(self, input):
+        return [[byte / 255 for byte in hashlib.sha1(text.encode('utf-8')).digest()[:8]] for text in input]
+
+
+def create_memory_service():
+    """MemoryService on an in-memory Chroma client with a stub embedder: nothing touches disk or loads a model"""
+    return MemoryService(client=chromadb.EphemeralClient(), embedding_function=HashEmbeddingFunction())
+
+
+TEST_CODE = """
 def authenticate_user(username, password):
     # Insecure: SQL injection vulnerability
     query = f"SELECT * FROM users WHERE username='{username}' AND password='{password}'"
     return db.execute(query)
-            """,
-            language="python"
-        )
-        print("✓ Code submission stored")
-    except Exception as e:
-        print(f"✗ Failed to store code: {e}")
-    
-    # Test security review storage
-    print("\n3. Testing Security Review Storage...")
-    try:
-        security_review = {
-            "review_time": datetime.now().isoformat(),
-            "files": [
+"""
+
+SECURITY_REVIEW = {
+    "review_time": datetime.now().isoformat(),
+    "files": [
+        {
+            "filename": "example.py",
+            "issues": [
                 {
-                    "filename": "example.py",
-                    "issues": [
-                        {
-                            "line": 3,
-                            "feedback": "SQL injection vulnerability: User input directly concatenated into query",
-                            "severity": {
-                                "level": "critical",
-                                "score": 5
-                            }
-                        }
-                    ]
+                    "line": 3,
+                    "feedback": "SQL injection vulnerability: User input directly concatenated into query",
+                    "severity": {
+                        "level": "critical",
+                        "score": 5
+                    }
                 }
             ]
         }
-        memory.store_security_review(
-            user_id="test_user_123",
-            project_id="proj_001",
-            review_data=security_review
-        )
-        print("✓ Security review stored")
-    except Exception as e:
-        print(f"✗ Failed to store review: {e}")
-    
-    # Test logic review storage
-    print("\n4. Testing Logic Review Storage...")
-    try:
-        logic_review = {
-            "review_time": datetime.now().isoformat(),
-            "files": [
+    ]
+}
+
+LOGIC_REVIEW = {
+    "review_time": datetime.now().isoformat(),
+    "files": [
+        {
+            "logic Errors": [
                 {
-                    "logic Errors": [
-                        {
-                            "function": "authenticate_user",
-                            "feedback": "No error handling for database connection failures"
-                        }
-                    ]
+                    "function": "authenticate_user",
+                    "feedback": "No error handling for database connection failures"
                 }
             ]
         }
-        memory.store_logic_review(
-            user_id="test_user_123",
-            submission_id="sub_001",
-            project_id="proj_001",
-            review_data=logic_review
-        )
-        print("✓ Logic review stored")
-    except Exception as e:
-        print(f"✗ Failed to store logic review: {e}")
-    
-    # Test similar code search
-    print("\n5. Testing Similar Code Search...")
-    try:
-        similar_code = memory.get_similar_code(
-            code_snippet="SELECT * FROM users WHERE",
-            user_id="test_user_123",
-            n_results=3
-        )
-        print(f"✓ Found {len(similar_code)} similar code items")
-        if similar_code:
-            print(f"  - Most similar: {similar_code[0]['metadata']['filename']}")
-            print(f"  - Distance: {similar_code[0]['distance']:.3f}")
-    except Exception as e:
-        print(f"✗ Failed to search similar code: {e}")
-    
-    # Test similar security issues
-    print("\n6. Testing Similar Security Issues Search...")
-    try:
-        similar_issues = memory.get_similar_security_issues(
-            issue_description="SQL injection",
-            user_id="test_user_123",
-            n_results=3
-        )
-        print(f"✓ Found {len(similar_issues)} similar security issues")
-        if similar_issues:
-            issue = similar_issues[0]
-            print(f"  - Severity: {issue['metadata']['severity']}")
-            print(f"  - File: {issue['metadata']['filename']}")
-    except Exception as e:
-        print(f"✗ Failed to search similar issues: {e}")
-    
-    # Test project context
-    print("\n7. Testing Project Context Storage...")
-    try:
-        memory.store_project_context(
-            user_id="test_user_123",
-            project_id="proj_001",
-            project_name="Test Security App",
-            project_desc="A sample application for testing security reviews",
-            file_structure=["example.py", "utils.py", "models.py"]
-        )
-        print("✓ Project context stored")
-    except Exception as e:
-        print(f"✗ Failed to store project context: {e}")
-    
-    # Test enhanced context retrieval
-    print("\n8. Testing Enhanced Context Retrieval...")
-    try:
-        enhanced_context = memory.get_enhanced_context(
-            user_id="test_user_123",
-            project_id="proj_001",
-            current_code="query = 'SELECT * FROM users WHERE id=' + user_id",
-            review_type="security"
-        )
-        print("✓ Enhanced context retrieved")
-        print(f"  - Similar code items: {len(enhanced_context.get('similar_code', []))}")
-        print(f"  - Past issues: {len(enhanced_context.get('past_issues', []))}")
-        print(f"  - Has project context: {enhanced_context.get('project_context') is not None}")
-    except Exception as e:
-        print(f"✗ Failed to get enhanced context: {e}")
-    
-    # Test user interaction storage
-    print("\n9. Testing User Interaction Storage...")
-    try:
-        memory.store_user_interaction(
-            user_id="test_user_123",
-            interaction_type="preference",
-            context="User prefers detailed security explanations with code examples",
-            metadata={"preference_type": "review_detail"}
-        )
-        print("✓ User interaction stored")
-    except Exception as e:
-        print(f"✗ Failed to store user interaction: {e}")
-    
-    # Get statistics
-    print("\n10. Getting Collection Statistics...")
-    try:
-        stats = memory.get_collection_stats()
-        print("✓ Collection statistics:")
-        for collection, count in stats.items():
-            print(f"  - {collection}: {count} items")
-    except Exception as e:
-        print(f"✗ Failed to get stats: {e}")
-    
-    # Test data cleanup
-    print("\n11. Testing Data Cleanup (GDPR)...")
-    try:
-        memory.clear_user_data("test_user_123")
-        print("✓ User data cleared")
-        
-        # Verify deletion
-        stats_after = memory.get_collection_stats()
-        print("  Statistics after cleanup:")
-        for collection, count in stats_after.items():
-            print(f"  - {collection}: {count} items")
-    except Exception as e:
-        print(f"✗ Failed to clear data: {e}")
-    
-    print("\n" + "="*60)
-    print("Memory Service Test Complete!")
-    print("="*60)
-    print("\nNext steps:")
-    print("1. If all tests passed, integrate into app.py")
-    print("2. Install dependencies: pip install -r requirements.txt")
-    print("3. Follow MEMORY_IMPLEMENTATION_GUIDE.md for integration")
-    print("\nCleanup:")
-    print("- Test database created at: ./test_chroma_db")
-    print("- You can delete this directory after testing")
-
-    # --- Auto-cleanup: remove the test Chroma DB directory created by this test ---
-    print("\n12. Cleaning up test database directory...")
-    # The test database path is created relative to the repository backend folder.
-    test_db_dir = os.path.join(parent_dir, "test_chroma_db")
-    try:
-        if os.path.exists(test_db_dir):
-            shutil.rmtree(test_db_dir)
-            print(f"✓ Removed test database at: {test_db_dir}")
-        else:
-            print(f"✓ No test database found at: {test_db_dir}")
-    except Exception as e:
-        print(f"✗ Failed to remove test database: {e}")
+    ]
+}
+
+
+@pytest.fixture(scope="session")
+def memory_service():
+    """One MemoryService (and Chroma client) shared by every memory test"""
+    return create_memory_service()
+
+
+@pytest.fixture(scope="session")
+def seeded_data(memory_service):
+    """Store one submission plus its security and logic reviews for TEST_USER, once per session"""
+    memory_service.store_code_submission(
+        user_id=TEST_USER,
+        submission_id="sub_001",
+        project_id="proj_001",
+        filename="example.py",
+        code=TEST_CODE,
+        language="python"
+    )
+    memory_service.store_security_review(
+        user_id=TEST_USER,
+        project_id="proj_001",
+        review_data=SECURITY_REVIEW
+    )
+    memory_service.store_logic_review(
+        user_id=TEST_USER,
+        submission_id="sub_001",
+        project_id="proj_001",
+        review_data=LOGIC_REVIEW
+    )
+    # Stores are written in the background; wait for them before searching
+    memory_service.flush()
+    yield TEST_USER
+    memory_service.clear_user_data(TEST_USER)
+
+
+def test_store_code_submission(memory_service, seeded_data):
+    stats = memory_service.get_collection_stats()
+    assert stats["code_submissions"] >= 1
+
+
+def test_store_reviews(memory_service, seeded_data):
+    stats = memory_service.get_collection_stats()
+    assert stats["security_reviews"] >= 1
+    assert stats["logic_reviews"] >= 1
+
+
+def test_similar_code_search(memory_service, seeded_data):
+    similar_code = memory_service.get_similar_code(
+        code_snippet="SELECT * FROM users WHERE",
+        user_id=seeded_data,
+        n_results=3
+    )
+    assert similar_code
+    assert similar_code[0]['metadata']['filename'] == "example.py"
+    assert similar_code[0]['code'] == TEST_CODE
+
+
+@pytest.mark.parametrize("search", ["get_similar_code", "get_similar_security_issues", "get_similar_logic_errors"])
+def test_code_query_matches_precomputed_embedding(memory_service, seeded_data, search):
+    """Direct code queries embed the same summary get_enhanced_context precomputes"""
+    embedding = memory_service.embedding_function([_summarize_code(TEST_CODE)])[0]
+    method = getattr(memory_service, search)
+    by_text = method(TEST_CODE, user_id=seeded_data, n_results=1)
+    by_embedding = method(TEST_CODE, user_id=seeded_data, n_results=1, embedding=embedding)
+    assert by_text[0]['distance'] == pytest.approx(by_embedding[0]['distance'])
+
+
+def test_similar_security_issues(memory_service, seeded_data):
+    similar_issues = memory_service.get_similar_security_issues(
+        issue_description="SQL injection",
+        user_id=seeded_data,
+        n_results=3
+    )
+    assert similar_issues
+    assert similar_issues[0]['metadata']['severity'] == "critical"
+    assert similar_issues[0]['metadata']['filename'] == "example.py"
+
+
+def test_similar_logic_errors(memory_service, seeded_data):
+    similar_errors = memory_service.get_similar_logic_errors(
+        "database connection failures",
+        user_id=seeded_data,
+        n_results=3
+    )
+    assert similar_errors
+
+
+def test_project_context(memory_service, seeded_data):
+    memory_service.store_project_context(
+        user_id=seeded_data,
+        project_id="proj_001",
+        project_name="Test Security App",
+        project_desc="A sample application for testing security reviews",
+        file_structure=["example.py", "utils.py", "models.py"]
+    )
+    context = memory_service.get_project_context(seeded_data, "proj_001")
+    assert context is not None
+    assert context['metadata']['project_name'] == "Test Security App"
+    assert context['metadata']['file_count'] == 3
+
+
+def test_enhanced_context(memory_service, seeded_data):
+    enhanced_context = memory_service.get_enhanced_context(
+        user_id=seeded_data,
+        project_id="proj_001",
+        current_code="query = 'SELECT * FROM users WHERE id=' + user_id",
+        review_type="security"
+    )
+    assert set(enhanced_context) == {"similar_code", "past_issues", "project_context", "user_preferences"}
+    assert enhanced_context["similar_code"]
+    assert enhanced_context["past_issues"]
+
+
+def test_store_user_interaction(memory_service, seeded_data):
+    memory_service.store_user_interaction(
+        user_id=seeded_data,
+        interaction_type="preference",
+        context="User prefers detailed security explanations with code examples",
+        metadata={"preference_type": "review_detail"}
+    )
+    preferences = memory_service.get_user_context(seeded_data, "preferences for security review", n_results=1)
+    assert preferences[0]['metadata']['preference_type'] == "review_detail"
+
+
+def test_collection_stats(memory_service, seeded_data):
+    stats = memory_service.get_collection_stats()
+    assert set(stats) == {"code_submissions", "security_reviews", "logic_reviews", "user_interactions", "projects"}
+    assert all(isinstance(count, int) for count in stats.values())
+
+
+def test_clear_user_data(memory_service):
+    """Clearing one user's data (GDPR) leaves nothing of theirs behind"""
+    user_id = "test_user_clear"
+    memory_service.store_code_submission(
+        user_id=user_id,
+        submission_id="sub_clear",
+        project_id="proj_clear",
+        filename="example.py",
+        code=TEST_CODE,
+        language="python"
+    )
+    memory_service.store_security_review(user_id=user_id, project_id="proj_clear", review_data=SECURITY_REVIEW)
+    memory_service.flush()
+    assert memory_service.get_similar_code("SELECT", user_id=user_id)
+
+    memory_service.clear_user_data(user_id)
+
+    assert memory_service.get_similar_code("SELECT", user_id=user_id) == []
+    assert memory_service.get_similar_security_issues("SQL injection", user_id=user_id) == []
+
+
+def main():
+    """Run the memory tests as a script"""
+    return pytest.main([__file__, "-v"])
 
 if __name__ == "__main__":
-    test_memory_service()
+    sys.exit(main())
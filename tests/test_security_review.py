@@ -1,29 +1,61 @@
 import os
+import sys
 import json
 import time
 import uuid
 import requests
 
 
-def main():
-    base_url = os.getenv("BASE_URL", "http://127.0.0.1:5000")
+def _post(client, base_url, path, payload, timeout):
+    """POST JSON in-process through a Flask test client, or over HTTP to base_url; returns (status, body text)"""
+    if client is not None:
+        resp = client.post(path, json=payload)
+        return resp.status_code, resp.get_data(as_text=True)
+    resp = requests.post(f"{base_url}{path}", json=payload, timeout=timeout)
+    return resp.status_code, resp.text
+
+
+def _created_data(status, body):
+    """Return the data of a successful create response, raising otherwise"""
+    if status not in (200, 201):
+        raise RuntimeError(f"Request failed with status {status}: {body}")
+    return json.loads(body)["data"]
+
+
+def main(client=None):
+    """
+    Create a project and submission, then request a security review.
+    Runs against BASE_URL when it is set, otherwise in-process through
+    the Flask test client (pass one in, or the app is imported here).
+    Returns the review response status.
+    """
+    base_url = os.getenv("BASE_URL")
     user_id = os.getenv("USER_ID", f"tester-{uuid.uuid4()}")
 
-    print(f"Using BASE_URL={base_url}")
+    if client is None and not base_url:
+        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        if base_dir not in sys.path:
+            sys.path.insert(0, base_dir)
+        from app import app
+        client = app.test_client()
+
+    print(f"Using BASE_URL={base_url}" if client is None else "Using in-process test client")
     print(f"Using USER_ID={user_id}")
 
     # 1) Create a project
-    resp = requests.post(
-        f"{base_url}/users/{user_id}/projects",
-        json={"project_name": "sec-review-demo", "project_desc": "automated test"},
+    status, body = _post(
+        client, base_url,
+        f"/users/{user_id}/projects",
+        {"project_name": "sec-review-demo", "project_desc": "automated test"},
         timeout=30,
     )
-    resp.raise_for_status()
-    project_id = resp.json()["projectid"]
+    project_id = _created_data(status, body)["projectid"]
     print(f"Created project: {project_id}")
 
     # 2) Create a submission under the project
     code_snippet = '''
+from collections import Counter
+
 import pandas as pd
 
 def find_duplicate_names(csv_files, name_column="Name"):
@@ -48,9 +80,8 @@ def find_duplicate_names(csv_files, name_column="Name"):
             print(f"Warning: {file} does not contain column '{name_column}'")
 
     # Find duplicates
-    duplicates = set([name for name in all_names if all_names.count(name) > 1])
-
-    return list(duplicates)
+    counts = Counter(all_names)
+    return [name for name, count in counts.items() if count > 1]
 
 
 # Example usage:
@@ -59,31 +90,37 @@ duplicate_names = find_duplicate_names(csv_files, name_column="Name")
 print("Duplicate Names:", duplicate_names)
 '''.strip()
 
-    resp = requests.post(
-        f"{base_url}/users/{user_id}/projects/{project_id}/submissions",
-        json={"filename": "insecure.py", "code": code_snippet},
+    status, body = _post(
+        client, base_url,
+        f"/users/{user_id}/projects/{project_id}/submissions",
+        {"filename": "insecure.py", "code": code_snippet},
         timeout=30,
     )
-    resp.raise_for_status()
-    submission_id = resp.json()["id"]
+    submission_id = _created_data(status, body)["id"]
     print(f"Created submission: {submission_id}")
 
     # 3) Trigger security review
     # Endpoint collects all project fileids and sends to LLM
     print("Requesting security review...")
-    resp = requests.post(
-        f"{base_url}/users/{user_id}/projects/{project_id}/security-review",
-        json={},
+    status, body = _post(
+        client, base_url,
+        f"/users/{user_id}/projects/{project_id}/security-review",
+        {},
         timeout=60,
     )
 
-    print(f"Status: {resp.status_code}")
+    print(f"Status: {status}")
     try:
-        data = resp.json()
+        data = json.loads(body)
         print(json.dumps(data, indent=2))
     except json.JSONDecodeError:
         print("Response was not valid JSON:")
-        print(resp.text)
+        print(body)
+    return status
+
+
+def test_security_review_flow(client):
+    assert main(client) == 200
 
 
 if __name__ == "__main__":